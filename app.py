@@ -1,21 +1,12 @@
-from generate_script import generate_script
-from generate_audio import generate_audio
-from create_video import create_video
+from pipeline import run_pipeline
 
 import sys
 
-def main(topic):
-    print(f"\n🎯 Generating script for topic: {topic}")
-    script_data = generate_script(topic)
-    narration_script = script_data["narration_script"]
-    image_script = script_data["image_script"]
-
-    print("\n🎤 Generating audio...")
-    audio_path = generate_audio(narration_script, topic)
-
-    print("\n🎬 Creating video...")
-    create_video(narration_script, image_script, audio_path, topic)
+def main(topic, regenerate_script=False):
+    return run_pipeline(topic, regenerate_script=regenerate_script)
 
 if __name__ == "__main__":
-    topic = " ".join(sys.argv[1:])
-    main(topic)
\ No newline at end of file
+    args = sys.argv[1:]
+    regenerate = "--regenerate" in args
+    topic = " ".join(arg for arg in args if arg != "--regenerate")
+    main(topic, regenerate_script=regenerate)
@@ -0,0 +1,72 @@
+"""Frames/sec of the Ken Burns effect: legacy moviepy resize vs. KenBurnsClip.
+
+Run from the project root:
+
+    python benchmarks/bench_ken_burns.py --frames 96
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviepy.editor import ImageClip, CompositeVideoClip
+from ken_burns import KenBurnsClip
+
+if not hasattr(Image, 'ANTIALIAS'):
+    Image.ANTIALIAS = Image.Resampling.LANCZOS
+
+def legacy_ken_burns(img_path, duration):
+    """The per-frame moviepy resize this module replaced"""
+    zoom_factor = random.uniform(1.1, 1.3)
+    x_start = random.uniform(0, 0.2)
+    y_start = random.uniform(0, 0.2)
+    clip = (ImageClip(img_path)
+            .resize(height=800)
+            .set_position("center")
+            .crop(x1=int(x_start * 1280), y1=int(y_start * 720), width=1280, height=720)
+            .resize(lambda t: 1 + (zoom_factor - 1) * t / duration)
+            .set_duration(duration))
+    # create_video always composites onto a 1280x720 canvas
+    return CompositeVideoClip([clip], size=(1280, 720)).set_duration(duration)
+
+def make_sample_image(path, size=(1880, 1253)):
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 255, size[0], dtype=np.float32)[None, :, None]
+    noise = rng.integers(0, 64, (size[1], size[0], 3))
+    Image.fromarray(np.clip(gradient + noise, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+def measure(clip, frames, fps=24):
+    start = time.perf_counter()
+    for i in range(frames):
+        clip.get_frame(i / fps)
+    return frames / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=96)
+    args = parser.parse_args()
+
+    duration = args.frames / 24
+    with tempfile.TemporaryDirectory() as tmp:
+        img_path = os.path.join(tmp, "sample.jpg")
+        make_sample_image(img_path)
+
+        results = {
+            "legacy (moviepy resize)": measure(legacy_ken_burns(img_path, duration), args.frames),
+            "KenBurnsClip bilinear": measure(KenBurnsClip(img_path, duration, quality="bilinear"), args.frames),
+            "KenBurnsClip lanczos": measure(KenBurnsClip(img_path, duration, quality="lanczos"), args.frames),
+        }
+
+    baseline = results["legacy (moviepy resize)"]
+    for name, fps in results.items():
+        print(f"{name:<26} {fps:8.1f} frames/sec  ({fps / baseline:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""End-to-end pipeline benchmark, fully offline: stage timings, peak RSS and encode frames/sec.
+
+Serves Pexels and OpenRouter from a local stand-in (fake_services.py) and
+synthesizes narration with the "tone" TTS backend, then runs app.main for
+short/medium/long canned scripts. Each run is a fresh subprocess with its
+own caches (later --repeat runs reuse them, measuring the warm path), so
+peak RSS is per run. Results are written as JSON for comparing commits.
+Run from the project root:
+
+    python benchmarks/bench_pipeline.py --scenarios short medium
+    python benchmarks/bench_pipeline.py --compare benchmarks/results/pipeline-<commit>.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import resource
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Narration sentences per scenario (about 5 s of speech each)
+SCENARIOS = {"short": 6, "medium": 24, "long": 90}
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SAMPLES_DIR = os.path.join(ROOT, "benchmarks", ".samples")
+
+def topic_for(scenario):
+    return f"benchmark {scenario}"
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def run_child(scenario, output):
+    """Inside the run subprocess: one app.main call, measured"""
+    from app import main
+    from media_probe import probe
+
+    start = time.perf_counter()
+    video_path, report = main(topic_for(scenario))
+    wall = time.perf_counter() - start
+    if video_path is None:
+        raise SystemExit("No video was produced")
+
+    stages = report["stages"]
+    frames = report["summary"]["frames_encoded"]
+    video_stage = stages.get("video", {}).get("duration")
+    result = {
+        "wall": round(wall, 3),
+        "stages": stages,
+        "summary": report["summary"],
+        "video_seconds": round(probe(video_path)["duration"], 3),
+        "output_fps": round(frames / video_stage, 2) if frames and video_stage else None,
+        # Python process only: Linux carries a parent's peak into forked children, so theirs would mislead
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def run_scenario(scenario, services, run_env, work_dir, run, verbose):
+    env = dict(os.environ, **services.env(), **run_env)
+    env.update({
+        "TTS_BACKEND": "tone",
+        "MEDIA_CACHE_DIR": os.path.join(work_dir, "cache", "media"),
+        "SCRIPT_CACHE_DIR": os.path.join(work_dir, "cache", "scripts"),
+        "TTS_CACHE_DIR": os.path.join(work_dir, "cache", "tts"),
+        "PYTHONPATH": os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])),
+    })
+    output = os.path.join(work_dir, f"result-{run}.json")
+    # Outputs and scratch folders land in the work directory, not the project's
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", scenario, output],
+                               cwd=work_dir, env=env,
+                               stdout=None if verbose else subprocess.DEVNULL,
+                               stderr=None if verbose else subprocess.PIPE, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{scenario} run {run} failed:\n{completed.stderr or ''}")
+    with open(output, encoding="utf-8") as f:
+        return json.load(f)
+
+def print_result(result):
+    stages = "  ".join(f"{name} {times['duration']:.1f}s" for name, times in result["stages"].items()
+                       if times["duration"] is not None)
+    fps = f"{result['output_fps']:.1f}" if result["output_fps"] else "-"
+    print(f"{result['scenario']:<7} run {result['run']}  {result['wall']:7.1f}s wall  "
+          f"{result['video_seconds']:6.1f}s video  {fps:>6} frames/s  "
+          f"{result['peak_rss_mb']:7.1f} MB peak RSS  [{stages}]")
+
+def compare(baseline_path, results):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    before = {(r["scenario"], r["run"]): r for r in baseline["results"]}
+    print(f"\nCompared with {baseline['commit']} ({baseline_path}):")
+    for result in results:
+        old = before.get((result["scenario"], result["run"]))
+        if old is None:
+            continue
+        def change(key):
+            if not old.get(key) or result.get(key) is None:
+                return "     -"
+            return f"{(result[key] / old[key] - 1) * 100:+6.1f}%"
+        print(f"{result['scenario']:<7} run {result['run']}  wall {change('wall')}  "
+              f"frames/s {change('output_fps')}  peak RSS {change('peak_rss_mb')}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=["short", "medium"])
+    parser.add_argument("--repeat", type=int, default=1, help="runs per scenario; runs after the first have warm caches")
+    parser.add_argument("--backend", help="RENDER_BACKEND for the runs")
+    parser.add_argument("--render-mode", help="RENDER_MODE for the runs")
+    parser.add_argument("--profile", help="RENDER_PROFILE for the runs")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every fake API response")
+    parser.add_argument("--output", help="JSON results path (default benchmarks/results/pipeline-<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    parser.add_argument("--child", nargs=2, metavar=("SCENARIO", "OUTPUT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return run_child(*args.child)
+
+    from fake_services import FakeServices, make_samples, canned_script
+
+    run_env = {name: value for name, value in (("RENDER_BACKEND", args.backend), ("RENDER_MODE", args.render_mode),
+                                               ("RENDER_PROFILE", args.profile)) if value}
+    scripts = {topic_for(name): canned_script(SCENARIOS[name], seed=i) for i, name in enumerate(SCENARIOS)}
+    print("Preparing sample media...")
+    make_samples(SAMPLES_DIR)
+
+    results = []
+    with FakeServices(SAMPLES_DIR, scripts, latency=args.latency) as services:
+        for scenario in args.scenarios:
+            work_dir = tempfile.mkdtemp(prefix=f"vidai-bench-{scenario}-")
+            try:
+                for run in range(1, args.repeat + 1):
+                    result = dict(run_scenario(scenario, services, run_env, work_dir, run, args.verbose),
+                                  scenario=scenario, run=run, sentences=SCENARIOS[scenario])
+                    results.append(result)
+                    print_result(result)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": dict(run_env, latency=args.latency),
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"pipeline-{commit}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Caption cost: moviepy TextClip (ImageMagick) vs. the Pillow CaptionOverlay.
+
+Measures caption creation time and composited frames/sec over a plain
+background. The TextClip path needs ImageMagick and is skipped without it.
+Run from the project root:
+
+    python benchmarks/bench_subtitles.py --captions 20 --frames 96
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from moviepy.editor import ColorClip, CompositeVideoClip, TextClip
+from subtitle_overlay import CaptionOverlay, render_caption
+
+SIZE = (1280, 720)
+FPS = 24
+SAMPLE = ("Photosynthesis turns sunlight, water and carbon dioxide into the sugars "
+          "that power almost every food chain on Earth")
+
+def captions(n):
+    words = SAMPLE.split()
+    return [" ".join(words[i % len(words):] + words[:i % len(words)])[:90] for i in range(n)]
+
+def legacy_segment(text, background, duration):
+    """The per-chunk TextClip composite create_video used to build"""
+    txt_clip = (TextClip(text, fontsize=38, font="Arial-Bold", color='white',
+                         bg_color="rgba(0,0,0,0.5)", size=(1000, None), method='caption')
+                .set_position(("center", "bottom"))
+                .set_duration(duration)
+                .margin(bottom=60, opacity=0)
+                .fadein(0.2).fadeout(0.2))
+    return CompositeVideoClip([background, txt_clip], size=SIZE).set_duration(duration)
+
+def overlay_segment(text, background, duration):
+    overlay = CaptionOverlay(text, duration, SIZE, FPS)
+    clip = CompositeVideoClip([background], size=SIZE).set_duration(duration)
+    return clip.fl(lambda get_frame, t: overlay.blit(get_frame(t), t))
+
+def measure(build, texts, frames):
+    duration = frames / FPS
+    background = ColorClip(SIZE, color=(40, 90, 150)).set_duration(duration)
+
+    start = time.perf_counter()
+    clips = [build(text, background, duration) for text in texts]
+    create_ms = (time.perf_counter() - start) / len(texts) * 1000
+
+    start = time.perf_counter()
+    for i in range(frames):
+        clips[i % len(clips)].get_frame(i / FPS)
+    return create_ms, frames / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--captions", type=int, default=20)
+    parser.add_argument("--frames", type=int, default=96)
+    args = parser.parse_args()
+    texts = captions(args.captions)
+
+    results = {}
+    try:
+        results["TextClip (ImageMagick)"] = measure(legacy_segment, texts, args.frames)
+    except Exception as e:
+        print(f"TextClip (ImageMagick)     skipped: {str(e).splitlines()[0][:80]}")
+
+    render_caption.cache_clear()
+    results["CaptionOverlay (cold)"] = measure(overlay_segment, texts, args.frames)
+    # Second pass: rasterized captions come from the cache
+    results["CaptionOverlay (cached)"] = measure(overlay_segment, texts, args.frames)
+
+    for name, (create_ms, fps) in results.items():
+        print(f"{name:<26} {create_ms:8.2f} ms/caption  {fps:8.1f} frames/sec")
+
+if __name__ == "__main__":
+    main()
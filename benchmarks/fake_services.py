@@ -0,0 +1,202 @@
+"""Local stand-ins for the Pexels and OpenRouter APIs, for offline benchmarks.
+
+FakeServices serves generated sample photos and clips through Pexels-shaped
+search results, and canned scripts through an OpenRouter-shaped chat
+completion endpoint (streamed as SSE when asked). Point the app at it with
+the environment from FakeServices.env(); pair it with TTS_BACKEND=tone.
+"""
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ffmpeg_utils import run_ffmpeg
+
+# (name, width, height, fps, seconds); the portrait clip exercises the ranking's rejection path
+SAMPLE_CLIPS = [
+    ("clip_1080p30", 1920, 1080, 30, 8),
+    ("clip_720p24", 1280, 720, 24, 6),
+    ("clip_720p25", 1280, 720, 25, 10),
+    ("clip_540p30", 960, 540, 30, 7),
+    ("clip_720p30_short", 1280, 720, 30, 3),
+    ("clip_portrait", 720, 1280, 30, 8),
+]
+SAMPLE_PHOTOS = 6
+PHOTO_SIZE = (1880, 1253)
+# Videos offered per search, picked from SAMPLE_CLIPS by query
+RESULTS_PER_QUERY = 3
+
+SENTENCE_WORDS = ("the", "process", "of", "energy", "moves", "through", "every", "living", "system", "and",
+                  "shapes", "how", "cells", "grow", "over", "time", "in", "nature", "water", "light")
+CUE_WORDS = ("forest", "ocean", "city", "laboratory", "mountain", "river", "desert", "factory",
+             "classroom", "volcano", "glacier", "market")
+
+def make_samples(directory):
+    """Write the sample photos and clips into directory (skipping ones already there)"""
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(0)
+    width, height = PHOTO_SIZE
+    for i in range(SAMPLE_PHOTOS):
+        path = os.path.join(directory, f"photo_{i}.jpg")
+        if os.path.exists(path):
+            continue
+        hue = np.array([(i * 67) % 256, (i * 131 + 80) % 256, (i * 29 + 160) % 256], dtype=np.float32)
+        gradient = np.linspace(0.3, 1.0, width, dtype=np.float32)[None, :, None] * hue
+        noise = rng.integers(0, 48, (height, width, 3))
+        Image.fromarray(np.clip(gradient + noise, 0, 255).astype(np.uint8)).save(path, quality=90)
+
+    for name, w, h, fps, seconds in SAMPLE_CLIPS:
+        path = os.path.join(directory, name + ".mp4")
+        if os.path.exists(path):
+            continue
+        run_ffmpeg(["-f", "lavfi", "-i", f"testsrc2=size={w}x{h}:rate={fps}:duration={seconds}",
+                    "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", path + ".tmp.mp4"])
+        os.replace(path + ".tmp.mp4", path)
+    return directory
+
+def canned_script(sentences, seed=0):
+    """A deterministic narration of n sentences (8-14 words) and one [cue] per sentence"""
+    rng = np.random.default_rng(seed)
+    narration = []
+    for _ in range(sentences):
+        words = list(rng.choice(SENTENCE_WORDS, size=int(rng.integers(8, 15))))
+        if len(words) > 9:
+            words[4] += ","
+        narration.append(" ".join(words).capitalize() + ".")
+    cues = [f"[{CUE_WORDS[i % len(CUE_WORDS)]} {i // len(CUE_WORDS) + 1}]" for i in range(sentences)]
+    return " ".join(narration) + "\n\n" + " ".join(cues)
+
+class FakeServices:
+    """Threaded HTTP server with Pexels search, media and OpenRouter completion endpoints.
+
+    scripts maps topic -> completion text; the topic is read back out of the
+    prompt. latency (seconds) is added to every API response, not to media.
+    """
+
+    def __init__(self, samples_dir, scripts, latency=0.0, chunk_chars=24):
+        self.samples_dir = samples_dir
+        self.scripts = scripts
+        self.latency = latency
+        self.chunk_chars = chunk_chars
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def env(self):
+        return {
+            "PEXELS_API_URL": self.url + "/v1/search",
+            "PEXELS_VIDEO_API_URL": self.url + "/videos/search",
+            "OPENROUTER_API_URL": self.url + "/api/v1/chat/completions",
+            "PEXELS_API_KEY": "offline",
+            "OPENROUTER_API_KEY": "offline",
+        }
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def photos(self, query, count):
+        photos = []
+        for i in range(count):
+            n = (zlib.crc32(query.encode("utf-8")) + i) % SAMPLE_PHOTOS
+            link = f"{self.url}/media/photo_{n}.jpg"
+            photos.append({"id": n, "width": PHOTO_SIZE[0], "height": PHOTO_SIZE[1],
+                           "src": {"original": link, "landscape": link, "large2x": link}})
+        return {"photos": photos, "per_page": count}
+
+    def videos(self, query, count):
+        start = zlib.crc32(query.encode("utf-8"))
+        videos = []
+        for i in range(min(count, RESULTS_PER_QUERY)):
+            name, w, h, fps, seconds = SAMPLE_CLIPS[(start + i) % len(SAMPLE_CLIPS)]
+            videos.append({"id": (start + i) % len(SAMPLE_CLIPS), "width": w, "height": h, "duration": seconds,
+                           "video_files": [{"link": f"{self.url}/media/{name}.mp4", "width": w, "height": h,
+                                            "fps": fps, "quality": "hd", "file_type": "video/mp4"}]})
+        return {"videos": videos, "per_page": count}
+
+    def _handler(self):
+        services = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _json(self, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                services.requests += 1
+                url = urlparse(self.path)
+                params = parse_qs(url.query)
+                query = params.get("query", [""])[0]
+                count = int(params.get("per_page", ["15"])[0])
+                if url.path == "/v1/search":
+                    time.sleep(services.latency)
+                    return self._json(services.photos(query, count))
+                if url.path == "/videos/search":
+                    time.sleep(services.latency)
+                    return self._json(services.videos(query, count))
+                if url.path.startswith("/media/"):
+                    path = os.path.join(services.samples_dir, os.path.basename(url.path))
+                    if os.path.isfile(path):
+                        self.send_response(200)
+                        self.send_header("Content-Type", "video/mp4" if path.endswith(".mp4") else "image/jpeg")
+                        self.send_header("Content-Length", str(os.path.getsize(path)))
+                        self.end_headers()
+                        with open(path, "rb") as f:
+                            self.wfile.write(f.read())
+                        return
+                self.send_error(404)
+
+            def do_POST(self):
+                services.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if urlparse(self.path).path != "/api/v1/chat/completions":
+                    return self.send_error(404)
+                time.sleep(services.latency)
+                prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+                match = re.search(r"topic '(.*?)'", prompt)
+                text = services.scripts.get(match.group(1) if match else "", "")
+                if not body.get("stream"):
+                    return self._json({"choices": [{"message": {"role": "assistant", "content": text}}]})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.wfile.write(b": OPENROUTER PROCESSING\n\n")
+                for i in range(0, len(text), services.chunk_chars):
+                    chunk = {"choices": [{"delta": {"content": text[i:i + services.chunk_chars]}}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        return Handler
@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from uuid import uuid4
+from metrics import registry
+
+def cache_key(*parts):
+    """Build a stable hex key from any JSON-serialisable parts"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class DiskCache:
+    """Content-addressed on-disk cache with size- and age-based LRU eviction.
+
+    Entries are plain files named by key. Every hit refreshes the file's
+    mtime, so the oldest mtime is always the least recently used entry.
+    Files used within `grace` seconds are never evicted for size, which keeps
+    assets that a running job is still reading on disk.
+    """
+
+    def __init__(self, directory, max_bytes, max_age, grace=3600, scan_interval=600, name=None):
+        self.directory = directory
+        # Label for hit/miss metrics, e.g. "assets" for cache/media/assets
+        self.name = name or os.path.basename(os.path.normpath(directory))
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.grace = grace
+        self.scan_interval = scan_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._size = None
+        self._last_scan = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key, suffix=""):
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def _record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        registry.inc("vidai_cache_requests_total", cache=self.name, result="hit" if hit else "miss")
+
+    def get_file(self, key, suffix=""):
+        """Return the cached file path for key, or None on a miss or expired entry"""
+        path = self.path_for(key, suffix)
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            self._record(False)
+            return None
+        if self.max_age and age > self.max_age:
+            self._remove(path)
+            self._record(False)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._record(True)
+        return path
+
+    def put_file(self, key, write, suffix=""):
+        """Store the output of write(tmp_path) under key and return the final path.
+
+        The file is written to a temporary name first and moved into place
+        atomically, so concurrent writers of the same key never expose a
+        partial file.
+        """
+        path = self.path_for(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid4().hex}.tmp"
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+        self._added(os.path.getsize(path))
+        return path
+
+    def get_json(self, key):
+        path = self.get_file(key, ".json")
+        if path is None:
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            self._remove(path)
+            return None
+
+    def put_json(self, key, value):
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+        return self.put_file(key, write, ".json")
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size_bytes": self._size or 0,
+            }
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except OSError:
+            return
+        with self._lock:
+            self.evictions += 1
+            if self._size is not None:
+                self._size = max(0, self._size - size)
+
+    def _added(self, size):
+        with self._lock:
+            if self._size is not None:
+                self._size += size
+            due = (self._size is None or self._size > self.max_bytes
+                   or time.time() - self._last_scan > self.scan_interval)
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                if name.endswith(".tmp"):
+                    # Leftover from a crashed writer
+                    if now - st.st_mtime > self.grace:
+                        os.unlink(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        with self._lock:
+            self._size = total
+            self._last_scan = now
+
+        entries.sort()
+        for mtime, size, path in entries:
+            expired = self.max_age and now - mtime > self.max_age
+            over_budget = total > self.max_bytes and now - mtime > self.grace
+            if not (expired or over_budget):
+                if total <= self.max_bytes:
+                    break
+                continue
+            self._remove(path)
+            total -= size
@@ -1,6 +1,22 @@
 from moviepy.editor import *
 import os
-from fetch_media import fetch_media  # Import fetch_media instead of fetch_images
+import math
+import time
+import shutil
+import tempfile
+import threading
+from bisect import bisect_right
+from proglog import ProgressBarLogger
+from concurrent.futures import ProcessPoolExecutor
+from fetch_media import fetch_media, submit_prefetch, cache_stats
+from ffmpeg_utils import concat_segments, mux_subtitles, faststart_args
+from media_probe import probe, normalize_media, submit_normalize, content_hash
+from cache_store import DiskCache, cache_key
+from generate_subtitles import cues_from_chunks, cue_sentences, align_to_audio, export_subtitles
+from ffmpeg_render import render_with_ffmpeg
+from ken_burns import KenBurnsClip, KEN_BURNS_QUALITY
+from subtitle_overlay import CaptionOverlay, caption_style
+from metrics import registry, cpu_seconds
 import re
 from PIL import Image
 import random
@@ -9,12 +25,43 @@ import random
 if not hasattr(Image, 'ANTIALIAS'):
     Image.ANTIALIAS = Image.Resampling.LANCZOS
 
+VIDEO_SIZE = (1280, 720)
+VIDEO_FPS = 24
+
+# "compose" renders the whole video in one moviepy pass; "segmented" encodes
+# every subtitle segment in its own process and stream-copies them together.
+RENDER_MODE = os.getenv("RENDER_MODE", "compose")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0")) or os.cpu_count() or 1
+
+# "moviepy" composites frames in Python; "ffmpeg" compiles the job into one
+# filter graph and falls back to moviepy if that render fails.
+RENDER_BACKEND = os.getenv("RENDER_BACKEND", "moviepy")
+
+# Encoder settings per render profile. "preview" trades quality for a fast
+# first cut; "final" is full 720p at a higher quality than moviepy's default.
+RENDER_PROFILES = {
+    "preview": {"size": (640, 360), "fps": VIDEO_FPS, "preset": "ultrafast", "crf": 30},
+    "final": {"size": VIDEO_SIZE, "fps": VIDEO_FPS, "preset": "medium", "crf": 20},
+}
+DEFAULT_PROFILE = os.getenv("RENDER_PROFILE", "final")
+
+# Encoded segments of segmented renders, keyed by everything that decides
+# their frames, so re-rendering an edited script only encodes what changed
+SEGMENT_CACHE_DIR = os.getenv("SEGMENT_CACHE_DIR", "cache/segments")
+SEGMENT_CACHE_MAX_BYTES = int(os.getenv("SEGMENT_CACHE_MAX_MB", "4096")) * 1024 * 1024
+SEGMENT_CACHE_TTL = int(os.getenv("SEGMENT_CACHE_TTL_HOURS", "168")) * 3600
+# Bump when a change to segment rendering should invalidate cached segments
+SEGMENT_FORMAT = 2
+
+segment_cache = DiskCache(SEGMENT_CACHE_DIR, SEGMENT_CACHE_MAX_BYTES, SEGMENT_CACHE_TTL, name="segments")
+
+# "burn" draws captions into the frames; "soft" adds them as an mp4 subtitle
+# track instead. SRT/WebVTT sidecars are written next to every render either way.
+SUBTITLE_MODE = os.getenv("SUBTITLE_MODE", "burn")
+
 def extract_keywords(image_script):
     return re.findall(r'\[(.*?)\]', image_script)
 
-def split_sentences(script):
-    return re.split(r'(?<=[.!?]) +', script)
-
 def split_subtitles(script, max_words=14):
     """Split script into subtitle chunks of up to max_words words."""
     words = script.split()
@@ -24,142 +71,560 @@ def split_subtitles(script, max_words=14):
         chunks.append(chunk)
     return chunks
 
-def apply_ken_burns_effect(img_path, duration):
-    zoom_factor = random.uniform(1.1, 1.3)
-    x_start = random.uniform(0, 0.2)
-    y_start = random.uniform(0, 0.2)
-    return (ImageClip(img_path)
-            .resize(height=800)  # slightly zoomed in
-            .set_position("center")
-            .crop(x1=int(x_start * 1280), y1=int(y_start * 720), width=1280, height=720)
-            .resize(lambda t: 1 + (zoom_factor - 1) * t / duration)
-            .set_duration(duration))
+def apply_ken_burns_effect(img_path, duration, quality=None, size=VIDEO_SIZE, zoom_factor=None, pan=None):
+    return KenBurnsClip(img_path, duration, size=size, zoom_factor=zoom_factor, pan=pan,
+                        quality=quality).set_position("center")
 
 def is_video_file(file_path):
     """Check if a file is a video based on its extension"""
     video_extensions = ['.mp4', '.mov', '.avi', '.mkv', '.webm']
     return os.path.splitext(file_path)[1].lower() in video_extensions
 
-def is_portrait_video(video_clip):
-    """Check if video is in portrait orientation (height > width)"""
-    return video_clip.h > video_clip.w
+def new_work_dir(prefix="job_"):
+    """A private scratch directory under videos/ for one job's narration and intermediates.
+
+    Jobs run in parallel in the same working directory, so each one only
+    ever writes to, and deletes, its own directory.
+    """
+    os.makedirs("videos", exist_ok=True)
+    return tempfile.mkdtemp(prefix=prefix, dir="videos")
+
+def frame_aligned_cues(cues, fps=VIDEO_FPS):
+    """Move cue boundaries onto frame boundaries; returns (cues, durations).
+
+    Every cue starts where the previous one ends, so the segments tile the
+    whole narration. Rounding the cut points (rather than each duration)
+    keeps the segments from drifting against the narration over a long video.
+    Halves always round up (round() would round them to even), so with
+    sentences padded to whole frames a cut only ever depends on its own
+    sentence, never on how many frames came before it.
+    """
+    def frame(t):
+        return math.floor(t * fps + 0.5 + 1e-6)
 
-def cleanup_temp_folders():
-    """Delete temporary media folders after successful video creation"""
-    temp_folders = ["videos", "images", "audio"]
-    for folder in temp_folders:
+    cuts = [0] + [frame(start) for start, _, _ in cues[1:]] + [frame(cues[-1][1])]
+    for i in range(1, len(cuts)):
+        cuts[i] = max(cuts[i], cuts[i - 1] + 1)
+    aligned = [(cuts[i] / fps, cuts[i + 1] / fps, text) for i, (_, _, text) in enumerate(cues)]
+    durations = [(cuts[i + 1] - cuts[i]) / fps for i in range(len(cues))]
+    return aligned, durations
+
+def segment_rng(media_path, cue_text, duration):
+    """Random source for a segment's clip offset and Ken Burns motion.
+
+    Seeded by the media's content, the segment's own subtitle text and its
+    duration (never its position), so planning the same segment again
+    (e.g. after a script edit elsewhere) picks the same values and its cached
+    render stays valid; pieces of one sentence sharing media still differ.
+    """
+    return random.Random(cache_key(content_hash(media_path), cue_text, round(duration, 6)))
+
+def plan_segment(index, text, duration, media_path, keyword, cue_text=None):
+    """Describe one subtitle chunk as a plain, picklable segment (media, kind, subclip offset, zoom/pan).
+
+    text is the burned-in caption (empty for soft subtitles); cue_text, the
+    chunk's subtitle text, seeds the offset and motion (defaults to text).
+    """
+    cue_text = text if cue_text is None else cue_text
+    segment = {"index": index, "text": text, "duration": duration, "media": media_path, "kind": "image", "start": 0}
+
+    if is_video_file(media_path):
         try:
-            if os.path.exists(folder):
-                print(f"🧹 Cleaning up temporary folder: {folder}")
-                for file in os.listdir(folder):
-                    file_path = os.path.join(folder, file)
-                    try:
-                        if os.path.isfile(file_path):
-                            os.unlink(file_path)
-                    except Exception as e:
-                        print(f"⚠️ Error deleting file {file_path}: {e}")
-                # Optional: remove the empty folder itself
-                # os.rmdir(folder)
-        except Exception as e:
-            print(f"⚠️ Error cleaning up {folder} folder: {e}")
+            # Orientation and length come from the (cached) probe, not a decoder
+            info = probe(media_path)
 
-def create_video(narration_script, image_script, audio_path, topic):
-    keywords = extract_keywords(image_script)
-    sentences = split_sentences(narration_script)
-
-    # keep original audio speed
-    audio = AudioFileClip(audio_path)
-    audio_duration = audio.duration
-
-    # Fetch media (videos and images) for each keyword
-    media_paths = []
-    for keyword in keywords:
-        media_paths += fetch_media(keyword, count=1, prefer_video=True)
-
-    # Split narration into subtitle chunks (1-2 lines each)
-    subtitle_chunks = split_subtitles(narration_script, max_words=14)
-    n_subs = len(subtitle_chunks)
-
-    # Ensure enough media for all subtitle chunks
-    if len(media_paths) < n_subs:
-        media_paths += fetch_media(topic, count=(n_subs - len(media_paths)), prefer_video=True)
-    media_paths = media_paths[:n_subs]  # Only as many as needed
-
-    sub_duration = audio_duration / n_subs
-    clips = []
-
-    for i in range(n_subs):
-        media_path = media_paths[i]
-        
-        # Create appropriate clip based on media type (video or image)
-        if is_video_file(media_path):
-            try:
-                # For videos, load and check orientation
-                video_clip = VideoFileClip(media_path)
-                
-                # If video is portrait, replace with an image instead
-                if is_portrait_video(video_clip):
-                    print(f"Portrait video detected, switching to image for subtitle {i+1}")
-                    video_clip.close()
-                    # Fetch a replacement image
-                    keyword = keywords[i % len(keywords)] if i < len(keywords) else topic
-                    replacement_paths = fetch_media(keyword, count=1, prefer_video=False)
-                    if replacement_paths:
-                        media_path = replacement_paths[0]
-                        content_clip = apply_ken_burns_effect(media_path, sub_duration)
-                    else:
-                        # If fetching image fails, still use the video but center crop it
-                        video_clip = VideoFileClip(media_path)
-                        video_clip = (video_clip
-                                     .resize(width=720)
-                                     .set_position("center")
-                                     .set_duration(sub_duration))
-                        content_clip = video_clip
-                else:
-                    # If video is landscape, process normally
-                    if video_clip.duration > sub_duration:
-                        max_start = max(0, video_clip.duration - sub_duration)
-                        start_time = random.uniform(0, max_start)
-                        video_clip = video_clip.subclip(start_time, start_time + sub_duration)
-                    
-                    if video_clip.duration < sub_duration:
-                        video_clip = video_clip.fx(vfx.loop, duration=sub_duration)
-                        
-                    video_clip = (video_clip
-                                 .resize(height=720)
-                                 .set_position("center")
-                                 .set_duration(sub_duration))
-                    content_clip = video_clip
-            except Exception as e:
-                print(f"Error processing video {media_path}: {e}, falling back to image")
-                # Fallback to image if video processing fails
-                replacement_paths = fetch_media(keywords[i % len(keywords)], count=1, prefer_video=False)
+            # If video is portrait, replace with an image instead
+            if info["portrait"]:
+                print(f"Portrait video detected, switching to image for subtitle {index+1}")
+                replacement_paths = fetch_media(keyword, count=1, prefer_video=False)
                 if replacement_paths:
-                    media_path = replacement_paths[0]
-                content_clip = apply_ken_burns_effect(media_path, sub_duration)
+                    segment["media"] = replacement_paths[0]
+                else:
+                    # If fetching image fails, still use the video but center crop it
+                    segment["kind"] = "portrait_video"
+            else:
+                segment["kind"] = "video"
+                if info["duration"] > duration:
+                    rng = segment_rng(media_path, cue_text, duration)
+                    segment["start"] = rng.uniform(0, max(0, info["duration"] - duration))
+        except Exception as e:
+            print(f"Error processing video {media_path}: {e}, falling back to image")
+            # Fallback to image if video processing fails
+            replacement_paths = fetch_media(keyword, count=1, prefer_video=False)
+            if replacement_paths:
+                segment["media"] = replacement_paths[0]
+
+    if segment["kind"] == "image":
+        rng = segment_rng(segment["media"], cue_text, duration)
+        segment["zoom"] = rng.uniform(1.1, 1.3)
+        segment["pan"] = (rng.uniform(0, 1), rng.uniform(0, 1))
+    return segment
+
+class TopicFill:
+    """Extra media for the topic itself, used where keyword cues run out or return nothing"""
+
+    def __init__(self, topic, initial_count):
+        self.topic = topic
+        self._paths = []
+        self._future = submit_prefetch([topic], count=initial_count)[0] if initial_count > 0 else None
+
+    def path(self, slot, extend=True):
+        """Topic media for slot; the same slot always gets the same asset.
+
+        Without extend, slots beyond the media already fetched wrap around
+        instead of fetching more.
+        """
+        if self._future is not None:
+            self._paths = self._future.result()
+            self._future = None
+        if (slot >= len(self._paths) and extend) or not self._paths:
+            # Pexels returns results in a stable order, so earlier paths keep their positions
+            count = max(slot + 1, len(self._paths) + 4) if extend else 4
+            self._paths = fetch_media(self.topic, count=count, prefer_video=True) or self._paths
+        if not self._paths:
+            raise RuntimeError(f"No media found for topic '{self.topic}'")
+        return normalize_media(self._paths[slot % len(self._paths)], VIDEO_SIZE, VIDEO_FPS)
+
+def plan_segments(keywords, media_futures, subtitle_chunks, durations, topic, cue_texts=None, sentences=None):
+    """Yield planned segments in order, each as soon as its own media has arrived.
+
+    Every subtitle chunk of sentence s uses the media fetched for keyword s
+    (sentences[i] is chunk i's sentence; by default each chunk is its own
+    sentence). Sentences beyond the keyword list (or whose keyword found
+    nothing) take media fetched for the topic. Splitting one sentence into
+    more or fewer chunks therefore never moves later chunks to other media.
+    """
+    cue_texts = subtitle_chunks if cue_texts is None else cue_texts
+    sentences = list(range(len(subtitle_chunks))) if sentences is None else sentences
+    n_sentences = max(sentences, default=-1) + 1
+    fill = TopicFill(topic, max(0, n_sentences - len(media_futures)))
+    for i, text in enumerate(subtitle_chunks):
+        s = sentences[i]
+        paths = media_futures[s].result() if s < len(media_futures) else []
+        keyword = keywords[s] if s < len(keywords) else topic
+        if paths:
+            media_path = paths[0]
+        elif s >= len(media_futures):
+            media_path = fill.path(s - len(media_futures))
         else:
-            # For images, apply Ken Burns effect as before
-            content_clip = apply_ken_burns_effect(media_path, sub_duration)
-
-        # Subtitle overlay (1-2 lines, bottom, not covering whole screen)
-        txt_clip = (TextClip(subtitle_chunks[i], fontsize=38, font="Arial-Bold", color='white',
-                            bg_color="rgba(0,0,0,0.5)", size=(1000, None), method='caption')
-                    .set_position(("center", "bottom"))
-                    .set_duration(sub_duration)
-                    .margin(bottom=60, opacity=0)
-                    .fadein(0.2).fadeout(0.2))
-        
-        composite = CompositeVideoClip([content_clip, txt_clip])
-        clips.append(composite)
-
-    video = concatenate_videoclips(clips, method="compose").set_audio(audio)
-
-    os.makedirs("output", exist_ok=True)
-    output_path = f"output/{topic.replace(' ', '_')}_video.mp4"
-    video.write_videofile(output_path, fps=24)
-
-    print(f"\n✅ Video Successfully created at: {output_path}")
-    
-    # Clean up temporary files after successful video creation
-    cleanup_temp_folders()
-    print("🧹 Temporary files cleaned up successfully.")
+            media_path = fill.path(s, extend=False)
+        yield plan_segment(i, text, durations[i], media_path, keyword, cue_texts[i])
+
+def output_path_for(topic, profile="final"):
+    """Where a render of topic is written; previews go to output/previews/"""
+    filename = f"{topic.replace(' ', '_')}_video.mp4"
+    if profile == "final":
+        return f"output/{filename}"
+    return f"output/{profile}s/{filename}"
+
+def encoder_params(profile):
+    """libx264 arguments for a render profile"""
+    return ["-preset", profile["preset"], "-crf", str(profile["crf"]), "-pix_fmt", "yuv420p"]
+
+def build_segment_clip(segment, size=VIDEO_SIZE, fps=VIDEO_FPS, sources=None):
+    """Build the media + subtitle composite for one planned segment.
+
+    File readers opened for the segment are appended to sources so the
+    caller can close them as soon as the segment is encoded.
+    """
+    duration = segment["duration"]
+    media_path = segment["media"]
+    height = size[1]
+    sources = [] if sources is None else sources
+
+    if segment["kind"] == "video":
+        # The narration replaces the soundtrack, so no audio reader is opened
+        video_clip = VideoFileClip(media_path, audio=False)
+        sources.append(video_clip)
+        if video_clip.duration > duration:
+            video_clip = video_clip.subclip(segment["start"], segment["start"] + duration)
+        if video_clip.duration < duration:
+            video_clip = video_clip.fx(vfx.loop, duration=duration)
+        if video_clip.h != height:
+            # Normalized clips are already at the final height; previews still scale down
+            video_clip = video_clip.resize(height=height)
+        content_clip = (video_clip
+                        .set_position("center")
+                        .set_duration(duration))
+    elif segment["kind"] == "portrait_video":
+        video_clip = VideoFileClip(media_path, audio=False)
+        sources.append(video_clip)
+        content_clip = (video_clip
+                        .resize(width=height)
+                        .set_position("center")
+                        .set_duration(duration))
+    else:
+        # For images, apply Ken Burns effect as before
+        content_clip = apply_ken_burns_effect(media_path, duration, size=size,
+                                              zoom_factor=segment.get("zoom"), pan=segment.get("pan"))
+
+    clip = CompositeVideoClip([content_clip], size=size).set_duration(duration)
+    if not segment["text"]:
+        # Soft subtitles: captions are muxed as a separate track
+        return clip
+
+    # Subtitle overlay (1-2 lines, bottom, not covering whole screen), rasterized once with Pillow
+    overlay = CaptionOverlay(segment["text"], duration, size, fps)
+    return clip.fl(lambda get_frame, t: overlay.blit(get_frame(t), t))
+
+class FrameProgress(ProgressBarLogger):
+    """moviepy logger that reports the fraction of frames written"""
+
+    def __init__(self, on_progress):
+        super().__init__()
+        self.on_progress = on_progress
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        total = self.bars[bar].get("total")
+        if bar == "t" and attr == "index" and total:
+            self.on_progress((value + 1) / total)
+
+def render_segment(segment, output_path, profile):
+    """Encode one segment (video only) to output_path; runs inside a worker process.
+
+    Returns {"path", "wall", "cpu"} for the segment metrics.
+    """
+    start, cpu_start = time.perf_counter(), cpu_seconds()
+    sources = []
+    clip = build_segment_clip(segment, profile["size"], profile["fps"], sources)
+    # moviepy samples np.arange(0, duration, 1/fps), which often yields one frame
+    # too many for frame-aligned durations; cap it so segments tile the narration
+    frames = round(segment["duration"] * profile["fps"])
+    try:
+        clip.write_videofile(output_path, fps=profile["fps"], codec="libx264", audio=False,
+                             preset=profile["preset"],
+                             ffmpeg_params=["-crf", str(profile["crf"]), "-frames:v", str(frames)],
+                             threads=1, logger=None)
+    finally:
+        close_clips(sources)
+    return {"path": output_path, "wall": time.perf_counter() - start, "cpu": cpu_seconds() - cpu_start}
+
+def close_clips(clips):
+    """Close file readers (and their ffmpeg subprocesses), ignoring ones already gone"""
+    for clip in clips:
+        try:
+            clip.close()
+        except Exception as e:
+            print(f"⚠️ Error closing clip: {e}")
+    clips.clear()
+
+class StreamingComposition(VideoClip):
+    """Planned segments played back to back, each built only while its frames are encoded.
+
+    Frames are requested in order when writing, so at most one segment's
+    readers, decoded image and caption are alive at a time; they are closed
+    as soon as the next segment starts. Memory use and open file handles
+    stay flat however many segments the video has. Each segment's wall and
+    CPU time (from opening it until the next one opens) is recorded like a
+    segmented render's.
+    """
+
+    def __init__(self, segments, size=VIDEO_SIZE, fps=VIDEO_FPS):
+        self.segments = list(segments)
+        self.starts = []
+        total = 0.0
+        for segment in self.segments:
+            self.starts.append(total)
+            total += segment["duration"]
+        self._size = size
+        self._fps = fps
+        self._current = None
+        self._clip = None
+        self._sources = []
+        self._opened = None
+        VideoClip.__init__(self, make_frame=self._make_frame, duration=total)
+
+    def _open(self, index):
+        self.release()
+        self._opened = (time.perf_counter(), cpu_seconds())
+        self._clip = build_segment_clip(self.segments[index], self._size, self._fps, self._sources)
+        self._current = index
+
+    def release(self):
+        """Drop the open segment, close its readers and record its timings"""
+        if self._current is not None:
+            start, cpu_start = self._opened
+            registry.observe("vidai_segment_render_seconds", time.perf_counter() - start)
+            registry.observe("vidai_segment_render_cpu_seconds", cpu_seconds() - cpu_start)
+        close_clips(self._sources)
+        self._clip = None
+        self._current = None
+
+    def _make_frame(self, t):
+        # Segment starts sit on frame boundaries; the epsilon absorbs float drift in t
+        index = min(max(bisect_right(self.starts, t + 1e-6) - 1, 0), len(self.segments) - 1)
+        if index != self._current:
+            self._open(index)
+        return self._clip.get_frame(t - self.starts[index])
+
+    def close(self):
+        self.release()
+
+def segment_cache_key(segment, profile):
+    """Cache key of an encoded segment: media content, offset, duration, caption, style and encoder profile"""
+    return cache_key(
+        "segment", SEGMENT_FORMAT, content_hash(segment["media"]), segment["kind"],
+        round(segment["start"], 6), round(segment["duration"], 6),
+        segment.get("zoom"), segment.get("pan"), KEN_BURNS_QUALITY if segment["kind"] == "image" else None,
+        segment["text"], caption_style() if segment["text"] else None, profile,
+    )
+
+def render_compose(segments, audio, output_path, profile, on_progress=None):
+    """Render every segment in a single moviepy pass, streaming one segment at a time"""
+    composition = StreamingComposition(segments, profile["size"], profile["fps"])
+    video = composition.set_audio(audio)
+    try:
+        # moviepy would put its temporary soundtrack in the working directory, shared by all jobs
+        video.write_videofile(output_path, fps=profile["fps"], codec="libx264",
+                              temp_audiofile=os.path.splitext(output_path)[0] + "_audio.mp3",
+                              preset=profile["preset"], ffmpeg_params=["-crf", str(profile["crf"]), *faststart_args()],
+                              logger=FrameProgress(on_progress) if on_progress else "bar")
+    finally:
+        # set_audio returns a copy; the original holds the open segment
+        composition.close()
+        audio.close()
+
+def render_segmented(segments, audio_path, output_path, profile, workers=None, on_progress=None, segment_count=None):
+    """Encode segments in parallel processes, then concat them without re-encoding.
+
+    segments may be a generator: each segment is submitted to the pool as
+    soon as it is yielded, so encoding overlaps with media still downloading.
+    Segments already in the segment cache (same media, offsets, caption,
+    style and profile) are reused as they are; the rest are encoded into it.
+    Each encoded segment's wall and CPU time is recorded as it finishes.
+    Returns the indexes of the segments this render reused.
+    """
+    segment_dir = new_work_dir("segments_")
+    workers = max(1, workers or RENDER_WORKERS)
+
+    try:
+        print(f"🎞️ Rendering segments on {workers} workers...")
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            jobs = []
+            reused = set()
+            done = [0]
+            lock = threading.Lock()
+
+            def count_done():
+                with lock:
+                    done[0] += 1
+                    count = done[0]
+                if on_progress and segment_count:
+                    on_progress(count / segment_count)
+
+            def finished(future):
+                if future.exception() is not None:
+                    return
+                stats = future.result()
+                registry.observe("vidai_segment_render_seconds", stats["wall"])
+                registry.observe("vidai_segment_render_cpu_seconds", stats["cpu"])
+                count_done()
+
+            for segment in segments:
+                key = segment_cache_key(segment, profile)
+                cached = segment_cache.get_file(key, ".mp4")
+                if cached is not None:
+                    jobs.append((key, cached))
+                    reused.add(segment["index"])
+                    count_done()
+                    continue
+                segment_path = os.path.join(segment_dir, f"segment_{segment['index']:05d}.mp4")
+                future = executor.submit(render_segment, segment, segment_path, profile)
+                future.add_done_callback(finished)
+                jobs.append((key, future))
+
+            segment_paths = []
+            for key, job in jobs:
+                if isinstance(job, str):
+                    segment_paths.append(job)
+                    continue
+                rendered = job.result()["path"]
+                # Move the fresh encode into the cache; the concat reads it from there
+                segment_paths.append(segment_cache.put_file(
+                    key, lambda tmp_path, src=rendered: shutil.move(src, tmp_path), ".mp4"))
+        if reused:
+            print(f"♻️ Reused {len(reused)} of {len(jobs)} segments from the segment cache")
+        concat_segments(segment_paths, audio_path, output_path)
+        return reused
+    finally:
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+def render_moviepy(segments, audio_path, output_path, profile, render_mode=None, render_workers=None,
+                   on_progress=None, segment_count=None):
+    """moviepy backend: one compose pass, or parallel segments joined by stream copy.
+
+    Returns the indexes of segments reused from the segment cache, if any.
+    """
+    if (render_mode or RENDER_MODE) == "segmented":
+        return render_segmented(segments, audio_path, output_path, profile, workers=render_workers,
+                         on_progress=on_progress, segment_count=segment_count)
+    else:
+        render_compose(segments, AudioFileClip(audio_path), output_path, profile, on_progress=on_progress)
+
+def render_ffmpeg(segments, audio_path, output_path, profile, render_mode=None, render_workers=None,
+                  on_progress=None, segment_count=None):
+    """ffmpeg backend: the whole job as a single filter_complex graph"""
+    render_with_ffmpeg(segments, audio_path, output_path, size=profile["size"], fps=profile["fps"],
+                       encoder_args=encoder_params(profile))
+
+RENDER_BACKENDS = {
+    "moviepy": render_moviepy,
+    "ffmpeg": render_ffmpeg,
+}
+
+def publish(rendered_path, output_path):
+    """Move a finished render and its subtitle sidecars into place, each with an atomic rename"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    base, target = os.path.splitext(rendered_path)[0], os.path.splitext(output_path)[0]
+    for ext in (".srt", ".vtt"):
+        if os.path.exists(base + ext):
+            os.replace(base + ext, target + ext)
+    os.replace(rendered_path, output_path)
+    return output_path
+
+def render_video(segments, audio_path, output_path, profile="final", backend=None,
+                 render_mode=None, render_workers=None, on_progress=None, segment_count=None,
+                 subtitles=None):
+    """Render planned segments with the chosen backend and profile.
+
+    The video is rendered in a private scratch directory (with subtitles,
+    a (cues, subtitle_mode) pair, finished there) and only then moved to
+    output_path, so readers and concurrent jobs never see a partial file.
+    on_progress(fraction) follows the encode where the backend can report
+    it. Frames encoded and render time are recorded per profile and backend.
+    """
+    render_dir = new_work_dir("render_")
+    try:
+        rendered_path = _render_video(segments, audio_path, os.path.join(render_dir, os.path.basename(output_path)),
+                                      profile, backend, render_mode, render_workers, on_progress, segment_count)
+        if subtitles:
+            finish_subtitles(*subtitles, rendered_path)
+        publish(rendered_path, output_path)
+    finally:
+        shutil.rmtree(render_dir, ignore_errors=True)
+    print(f"✅ {profile.capitalize()} video created at: {output_path}")
+    return output_path
+
+def _render_video(segments, audio_path, output_path, profile, backend, render_mode, render_workers,
+                  on_progress, segment_count):
+    settings = RENDER_PROFILES[profile]
+    backend = backend or RENDER_BACKEND
+    planned_segments = []
+
+    def planned(segments):
+        for segment in segments:
+            planned_segments.append(segment)
+            yield segment
+
+    if backend != "moviepy" or (render_mode or RENDER_MODE) != "segmented":
+        # Only segmented moviepy renders consume segments while they are still being planned
+        segments = list(planned(segments))
+        segment_count = len(segments)
+    else:
+        segments = planned(segments)
+
+    start = time.perf_counter()
+    used = backend
+    try:
+        reused = RENDER_BACKENDS[backend](segments, audio_path, output_path, settings, render_mode,
+                                          render_workers, on_progress, segment_count)
+    except Exception as e:
+        if backend == "moviepy":
+            raise
+        print(f"⚠️ {backend} render failed ({e}), falling back to moviepy")
+        used = "moviepy"
+        reused = render_moviepy(segments, audio_path, output_path, settings, render_mode, render_workers,
+                                on_progress, segment_count)
+    elapsed = time.perf_counter() - start
+    if on_progress:
+        on_progress(1.0)
+
+    # Segments reused from the segment cache were not encoded by this render
+    reused = reused or set()
+    encoded = [segment["duration"] for segment in planned_segments if segment["index"] not in reused]
+    frames = round(sum(encoded) * settings["fps"])
+    registry.inc("vidai_frames_encoded_total", frames, profile=profile, backend=used)
+    if reused:
+        registry.inc("vidai_segments_reused_total", len(reused), profile=profile)
+    registry.observe("vidai_render_seconds", elapsed, profile=profile, backend=used)
+    print(f"\n🎞️ Encoded {frames} frames in {elapsed:.1f}s ({frames / elapsed if elapsed else 0:.1f} fps)")
+    return output_path
+
+def subtitle_cues(narration_script, audio_path, narration_chunks=None):
+    """(start, end, text) subtitle cues timed against the narration audio.
+
+    Uses the sentence durations reported by chunked TTS when available,
+    otherwise aligns 14-word chunks to pauses in the decoded waveform.
+    """
+    if narration_chunks:
+        return cues_from_chunks(narration_chunks, max_words=14)
+    return align_to_audio(split_subtitles(narration_script, max_words=14), audio_path)
+
+def finish_subtitles(cues, subtitle_mode, output_path):
+    """Write SRT/VTT sidecars for a render and, for soft subtitles, mux the SRT into it"""
+    srt_path, _ = export_subtitles(cues, output_path)
+    if subtitle_mode == "soft":
+        mux_subtitles(output_path, srt_path)
+
+def create_video(narration_script, image_script, audio_path, topic, media_futures=None,
+                 render_mode=None, render_workers=None, backend=None, profile=None,
+                 preview_first=False, on_preview=None, narration_chunks=None, subtitle_mode=None,
+                 on_progress=None):
+    """Fetch media, plan segments and render the video for topic.
+
+    media_futures, one per [cue] keyword, lets a caller start the downloads
+    earlier (see pipeline.run_pipeline); otherwise they are started here.
+    narration_chunks, the per-sentence timings from generate_narration,
+    place segment cuts and subtitles on real sentence boundaries.
+    on_progress(fraction) reports the share of rendering done (a preview
+    render counts for the first quarter).
+    With preview_first, a fast "preview" render of the same plan is written
+    first and passed to on_preview(path) before the requested profile is
+    rendered. Returns the path of the last render.
+    """
+    keywords = extract_keywords(image_script)
+    profile = profile or DEFAULT_PROFILE
+
+    # Fetch media (videos and images) for all keywords concurrently, keeping keyword order
+    if media_futures is None:
+        media_futures = submit_prefetch(keywords, count=1, prefer_video=True)
+    # Probe and transcode each clip to the 1280x720/24fps intermediate as soon as it lands
+    media_futures = [submit_normalize(future, VIDEO_SIZE, VIDEO_FPS) for future in media_futures]
+
+    subtitle_mode = subtitle_mode or SUBTITLE_MODE
+
+    # Subtitle chunks (1-2 lines each) and their timing drive the segment cuts
+    cues, durations = frame_aligned_cues(subtitle_cues(narration_script, audio_path, narration_chunks))
+    n_subs = len(cues)
+    captions = [text if subtitle_mode == "burn" else "" for _, _, text in cues]
+    # Media follows sentences, so a re-split sentence leaves the rest of the plan alone
+    sentences = cue_sentences(narration_chunks, max_words=14) if narration_chunks else list(range(n_subs))
+
+    segments = plan_segments(keywords, media_futures[:max(sentences) + 1], captions, durations, topic,
+                             cue_texts=[text for _, _, text in cues], sentences=sentences)
+    if preview_first:
+        # Both renders share one plan
+        segments = list(segments)
+
+    render_options = {"backend": backend, "render_mode": render_mode, "render_workers": render_workers,
+                      "segment_count": n_subs, "subtitles": (cues, subtitle_mode)}
+
+    def render_progress(offset, share):
+        if on_progress is None:
+            return None
+        return lambda fraction: on_progress(offset + share * fraction)
+
+    final_offset = 0.0
+    if preview_first and profile != "preview":
+        final_offset = 0.25
+        preview_path = render_video(segments, audio_path, output_path_for(topic, "preview"), "preview",
+                                    on_progress=render_progress(0.0, final_offset), **render_options)
+        if on_preview:
+            on_preview(preview_path)
+
+    output_path = render_video(segments, audio_path, output_path_for(topic, profile), profile,
+                               on_progress=render_progress(final_offset, 1 - final_offset), **render_options)
+
+    assets = cache_stats()["assets"]
+    print(f"📦 Media cache: {assets['hits']} hits, {assets['misses']} misses")
+    return output_path
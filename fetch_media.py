@@ -1,66 +1,173 @@
-import requests
 import os
 import shutil
-from uuid import uuid4
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
 from dotenv import load_dotenv
+from cache_store import DiskCache, cache_key
+import http_client
+from metrics import registry
 
 load_dotenv()
 
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY")
-PEXELS_API_URL = "https://api.pexels.com/v1/search"
+# Overridable so benchmarks can point at a local stand-in (benchmarks/fake_services.py)
+PEXELS_API_URL = os.getenv("PEXELS_API_URL", "https://api.pexels.com/v1/search")
+PEXELS_VIDEO_API_URL = os.getenv("PEXELS_VIDEO_API_URL", "https://api.pexels.com/videos/search")
 
 headers = {
     "Authorization": PEXELS_API_KEY
 }
 
-def fetch_images(query, count=1):
-    response = requests.get(PEXELS_API_URL, headers=headers, params={"query": query, "per_page": count})
+# Concurrency limits for the prefetch stage
+MEDIA_FETCH_WORKERS = int(os.getenv("MEDIA_FETCH_WORKERS", "8"))
+MEDIA_FETCH_PER_HOST = int(os.getenv("MEDIA_FETCH_PER_HOST", "4"))
+
+# Persistent media cache shared by all jobs (search results and downloaded assets)
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "cache/media")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_MB", "4096")) * 1024 * 1024
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE_DAYS", "14")) * 86400
+SEARCH_CACHE_MAX_AGE = int(os.getenv("SEARCH_CACHE_MAX_AGE_HOURS", "24")) * 3600
+
+# One search per query returns this many candidates to choose from
+SEARCH_CANDIDATES = int(os.getenv("PEXELS_CANDIDATES", "15"))
+# Expected on-screen time of one clip (a 14-word caption at ~150 words/min) until real timings are known
+TARGET_SEGMENT_SECONDS = 6.0
+MIN_VIDEO_HEIGHT = 720
+
+search_cache = DiskCache(os.path.join(MEDIA_CACHE_DIR, "search"), 64 * 1024 * 1024, SEARCH_CACHE_MAX_AGE)
+asset_cache = DiskCache(os.path.join(MEDIA_CACHE_DIR, "assets"), MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_MAX_AGE)
+
+_prefetch_executor = None
+_prefetch_lock = threading.Lock()
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+def _host_slot(url):
+    """Return the semaphore that caps concurrent connections to the url's host"""
+    host = urlparse(url).netloc
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MEDIA_FETCH_PER_HOST)
+        return _host_slots[host]
+
+def _search(url, query, count, kind):
+    key = cache_key(query.strip().lower(), kind, count)
+    data = search_cache.get_json(key)
+    if data is not None:
+        return data
+
+    with _host_slot(url):
+        response = http_client.get(url, route=f"{kind}/search", headers=headers,
+                                   params={"query": query, "per_page": count})
+    response.raise_for_status()
     data = response.json()
-    image_urls = [photo["src"]["landscape"] for photo in data.get("photos", [])]
+    if kind in data:
+        search_cache.put_json(key, data)
+    return data
+
+def _download(url, suffix):
+    """Return a local path for url, downloading it into the asset cache on a miss"""
+    key = cache_key(url)
+    path = asset_cache.get_file(key, suffix)
+    if path is not None:
+        return path
+
+    def write(tmp_path):
+        with _host_slot(url):
+            with http_client.get(url, route="download", stream=True) as r:
+                r.raise_for_status()
+                r.raw.decode_content = True
+                with open(tmp_path, "wb") as f:
+                    shutil.copyfileobj(r.raw, f)
+
+    path = asset_cache.put_file(key, write, suffix)
+    registry.inc("vidai_download_bytes_total", os.path.getsize(path), host=urlparse(url).netloc)
+    return path
+
+def cache_stats():
+    """Hit/miss counters for the search and asset caches"""
+    return {"search": search_cache.stats(), "assets": asset_cache.stats()}
+
+def fetch_images(query, count=1):
+    # Always the same candidate page, so later lookups for the query are cache hits
+    data = _search(PEXELS_API_URL, query, max(count, SEARCH_CANDIDATES), "photos")
+    photos = [photo for photo in data.get("photos", []) if not is_portrait(photo)] or data.get("photos", [])
+    image_urls = [photo["src"]["landscape"] for photo in photos[:count]]
 
-    os.makedirs("images", exist_ok=True)
     image_paths = []
     for url in image_urls:
-        img_name = f"images/{uuid4().hex}.jpg"
-        with requests.get(url, stream=True) as r:
-            with open(img_name, "wb") as f:
-                shutil.copyfileobj(r.raw, f)
-        image_paths.append(img_name)
+        image_paths.append(_download(url, ".jpg"))
 
     return image_paths
 
-def fetch_videos(query, count=1):
-    """Fetch videos from Pexels API"""
-    video_url = "https://api.pexels.com/videos/search"
-    response = requests.get(video_url, headers=headers, params={"query": query, "per_page": count})
-    data = response.json()
-    
-    video_urls = []
-    for video in data.get("videos", []):
-        # Get the smallest HD video file
-        video_files = video.get("video_files", [])
-        hd_videos = [vf for vf in video_files if vf.get("quality") == "hd" and vf.get("width", 0) <= 1920]
-        if hd_videos:
-            video_urls.append(hd_videos[0]["link"])
-    
-    os.makedirs("videos", exist_ok=True)
+def is_portrait(item):
+    """Whether a Pexels video/file entry is taller than wide (unknown sizes count as landscape)"""
+    return (item.get("height") or 0) > (item.get("width") or 0)
+
+def pick_video_file(video):
+    """Smallest landscape file of a Pexels video that is at least 720p (else the largest one below)"""
+    files = [vf for vf in video.get("video_files", [])
+             if vf.get("link") and vf.get("width") and vf.get("height") and not is_portrait(vf)
+             and vf["width"] <= 1920]
+    if not files:
+        return None
+    hd = [vf for vf in files if vf["height"] >= MIN_VIDEO_HEIGHT]
+    if hd:
+        return min(hd, key=lambda vf: vf["width"] * vf["height"])
+    return max(files, key=lambda vf: vf["width"] * vf["height"])
+
+def score_video(video, target_duration):
+    """Lower is better: (score, file) for a Pexels video, or None if it is unusable.
+
+    Clips shorter than the segment would have to loop, so they are
+    penalised much more than clips that are merely longer; files below
+    720p and files much larger than 720p cost a little extra.
+    """
+    if is_portrait(video):
+        return None
+    video_file = pick_video_file(video)
+    if video_file is None:
+        return None
+    duration = video.get("duration") or 0
+    if duration >= target_duration:
+        fit = min(1.0, (duration - target_duration) / target_duration) * 0.2
+    else:
+        fit = 2.0 * (target_duration - duration) / target_duration
+    pixels = video_file["width"] * video_file["height"] / (1280 * 720)
+    size = (1.0 - pixels) if pixels < 1 else (pixels - 1) * 0.1
+    return fit + size, video_file
+
+def rank_videos(videos, target_duration):
+    """Usable Pexels videos as (video, file) pairs, best first (stable for equal scores)"""
+    scored = [(score_video(video, target_duration), i, video) for i, video in enumerate(videos)]
+    scored = [(result[0], i, video, result[1]) for result, i, video in scored if result is not None]
+    return [(video, video_file) for _, _, video, video_file in sorted(scored, key=lambda item: item[:2])]
+
+def fetch_videos(query, count=1, target_duration=None):
+    """Fetch the count best-fitting landscape videos for query from Pexels.
+
+    One search returns a page of candidates; they are ranked by orientation,
+    duration against target_duration and file size, and only the winners are
+    downloaded. The page stays in the search cache for later segments.
+    """
+    data = _search(PEXELS_VIDEO_API_URL, query, max(count, SEARCH_CANDIDATES), "videos")
+    ranked = rank_videos(data.get("videos", []), target_duration or TARGET_SEGMENT_SECONDS)
+
     video_paths = []
-    for url in video_urls:
-        video_name = f"videos/{uuid4().hex}.mp4"
-        with requests.get(url, stream=True) as r:
-            with open(video_name, "wb") as f:
-                shutil.copyfileobj(r.raw, f)
-        video_paths.append(video_name)
-    
+    for _, video_file in ranked[:count]:
+        video_paths.append(_download(video_file["link"], ".mp4"))
+
     return video_paths
 
-def fetch_media(query, count=1, prefer_video=True):
+def fetch_media(query, count=1, prefer_video=True, target_duration=None):
     """Fetch both videos and images, preferring videos if available"""
     media_paths = []
     
     try:
         if prefer_video:
-            video_paths = fetch_videos(query, count)
+            video_paths = fetch_videos(query, count, target_duration)
             media_paths.extend(video_paths)
         
         # Fill remaining with images if needed
@@ -78,3 +185,16 @@ def fetch_media(query, count=1, prefer_video=True):
             print(f"❌ Error fetching fallback images: {e2}")
     
     return media_paths
+
+
+def submit_prefetch(queries, count=1, prefer_video=True, target_duration=None):
+    """Start fetching media for every query on the shared pool; returns one future per query.
+
+    Lets callers start downloads early (e.g. while narration is synthesized)
+    and consume each result as soon as it arrives.
+    """
+    global _prefetch_executor
+    with _prefetch_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(max_workers=MEDIA_FETCH_WORKERS, thread_name_prefix="prefetch")
+    return [_prefetch_executor.submit(fetch_media, query, count, prefer_video, target_duration) for query in queries]
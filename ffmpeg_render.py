@@ -0,0 +1,139 @@
+import os
+import random
+import shutil
+import tempfile
+from ffmpeg_utils import run_ffmpeg, faststart_args
+
+# Optional directory of .ttf/.otf files for libass when fontconfig has no Arial
+SUBTITLE_FONTS_DIR = os.getenv("SUBTITLE_FONTS_DIR")
+
+# Same framing as ken_burns.KenBurnsClip: sources are cover-scaled to 800px tall
+OVERSCAN = 800 / 720
+
+DEFAULT_ENCODER_ARGS = ["-preset", "medium", "-crf", "20", "-pix_fmt", "yuv420p"]
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: {width}
+PlayResY: {height}
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,38,&H00FFFFFF,&H00FFFFFF,&H80000000,&H80000000,-1,0,0,0,100,100,0,0,3,8,0,2,{margin_h},{margin_h},60,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+def _ass_time(seconds):
+    centis = int(round(seconds * 100))
+    hours, centis = divmod(centis, 360000)
+    minutes, centis = divmod(centis, 6000)
+    secs, centis = divmod(centis, 100)
+    return f"{hours}:{minutes:02d}:{secs:02d}.{centis:02d}"
+
+def write_ass_subtitles(cues, path):
+    """Write (start, end, text) cues as an ASS file styled like the moviepy captions.
+
+    Styles are laid out on a 1280x720 canvas; libass scales them to whatever
+    size the video is actually rendered at.
+    """
+    width, height = 1280, 720
+    with open(path, "w", encoding="utf-8") as f:
+        # 1000px wide caption box, centred
+        f.write(ASS_HEADER.format(width=width, height=height, margin_h=(width - 1000) // 2))
+        for start, end, text in cues:
+            text = text.replace("\n", " ").replace("{", "(").replace("}", ")")
+            f.write(f"Dialogue: 0,{_ass_time(start)},{_ass_time(end)},Default,,0,0,0,,{{\\fad(200,200)}}{text}\n")
+    return path
+
+def _filter_path(path):
+    """Quote a path for use as a filter option value"""
+    return "'" + os.path.abspath(path).replace("\\", "/").replace(":", "\\:").replace("'", "\\'") + "'"
+
+def segment_filter(segment, input_index, size, fps):
+    """Inputs and filter chain that turn one planned segment into a size/fps video stream"""
+    width, height = size
+    duration = segment["duration"]
+    frames = max(1, int(round(duration * fps)))
+    label = f"v{segment['index']}"
+
+    if segment["kind"] == "image":
+        # Planned segments carry their (seeded) motion; pick one for any that don't
+        zoom_factor = segment.get("zoom") or random.uniform(1.1, 1.3)
+        pan_x, pan_y = segment.get("pan") or (random.uniform(0, 1), random.uniform(0, 1))
+        src_w, src_h = int(round(width * OVERSCAN)), int(round(height * OVERSCAN))
+        cx = pan_x * (src_w - width) + width / 2
+        cy = pan_y * (src_h - height) + height / 2
+        zoom = f"{OVERSCAN:.5f}*(1+{zoom_factor - 1:.5f}*on/{frames})"
+        inputs = ["-i", segment["media"]]
+        chain = (f"[{input_index}:v]scale={src_w}:{src_h}:force_original_aspect_ratio=increase,"
+                 f"crop={src_w}:{src_h},"
+                 f"zoompan=z='{zoom}':x='{cx:.2f}-iw/zoom/2':y='{cy:.2f}-ih/zoom/2'"
+                 f":d={frames}:s={width}x{height}:fps={fps},")
+    elif segment["kind"] == "portrait_video":
+        inputs = ["-stream_loop", "-1", "-t", f"{duration:.3f}", "-i", segment["media"]]
+        chain = (f"[{input_index}:v]scale=-2:{height},"
+                 f"pad={width}:{height}:(ow-iw)/2:0,fps={fps},")
+    else:
+        inputs = ["-ss", f"{segment['start']:.3f}", "-stream_loop", "-1", "-t", f"{duration:.3f}",
+                  "-i", segment["media"]]
+        chain = (f"[{input_index}:v]scale={width}:{height}:force_original_aspect_ratio=increase,"
+                 f"crop={width}:{height},fps={fps},")
+
+    chain += f"setsar=1,format=yuv420p,trim=end_frame={frames},setpts=PTS-STARTPTS[{label}]"
+    return inputs, chain, label
+
+def render_with_ffmpeg(segments, audio_path, output_path, size=(1280, 720), fps=24, encoder_args=None):
+    """Render the whole job as one ffmpeg process with a single filter_complex graph.
+
+    Every segment is scaled/cropped (videos) or zoompanned (images), the
+    segments are concatenated, captions (segments with text) are burned in
+    with libass and the
+    narration is muxed, all without frames passing through Python.
+    """
+    os.makedirs("videos", exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="ffmpeg_", dir="videos")
+    try:
+        args = []
+        chains = []
+        labels = []
+        cues = []
+        t = 0.0
+        for i, segment in enumerate(segments):
+            inputs, chain, label = segment_filter(segment, i, size, fps)
+            args += inputs
+            chains.append(chain)
+            labels.append(f"[{label}]")
+            if segment["text"]:
+                cues.append((t, t + segment["duration"], segment["text"]))
+            t += segment["duration"]
+
+        subtitles = ""
+        if cues:
+            subtitles_path = write_ass_subtitles(cues, os.path.join(work_dir, "subtitles.ass"))
+            subtitles = f",subtitles=filename={_filter_path(subtitles_path)}"
+            if SUBTITLE_FONTS_DIR:
+                subtitles += f":fontsdir={_filter_path(SUBTITLE_FONTS_DIR)}"
+
+        chains.append(f"{''.join(labels)}concat=n={len(labels)}:v=1:a=0{subtitles}[vout]")
+        graph_path = os.path.join(work_dir, "graph.txt")
+        with open(graph_path, "w", encoding="utf-8") as f:
+            f.write(";\n".join(chains))
+
+        audio_index = len(segments)
+        args += [
+            "-i", audio_path,
+            "-filter_complex_script", graph_path,
+            "-map", "[vout]", "-map", f"{audio_index}:a:0",
+            "-c:v", "libx264", *(encoder_args or DEFAULT_ENCODER_ARGS), "-r", str(fps),
+            "-c:a", "aac", "-b:a", "192k",
+            "-shortest",
+            *faststart_args(),
+            output_path,
+        ]
+        run_ffmpeg(args)
+        return output_path
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import imageio_ffmpeg
+
+# Same ffmpeg build that moviepy uses
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY") or imageio_ffmpeg.get_ffmpeg_exe()
+
+# Put the moov atom at the front of finished MP4s so playback can start while downloading
+MP4_FASTSTART = os.getenv("MP4_FASTSTART", "true").lower() in ("1", "true", "yes")
+
+def faststart_args():
+    """Muxer flags for a final (deliverable) MP4"""
+    return ["-movflags", "+faststart"] if MP4_FASTSTART else []
+
+def run_ffmpeg(args):
+    """Run ffmpeg with the given arguments, raising RuntimeError with its stderr on failure"""
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-y"] + list(args)
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+
+def concat_segments(segment_paths, audio_path, output_path):
+    """Join encoded segments with the concat demuxer (stream copy) and mux in the narration"""
+    list_path = output_path + ".segments.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for path in segment_paths:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+
+    try:
+        run_ffmpeg([
+            "-f", "concat", "-safe", "0", "-i", list_path,
+            "-i", audio_path,
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+            "-shortest",
+            *faststart_args(),
+            output_path,
+        ])
+    finally:
+        os.unlink(list_path)
+    return output_path
+
+def decode_audio(path, sample_rate=16000):
+    """Decode any audio file to a mono int16 NumPy array at sample_rate"""
+    import numpy as np
+    cmd = [FFMPEG_BINARY, "-hide_banner", "-loglevel", "error", "-i", path,
+           "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "-"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+def mux_subtitles(video_path, subtitles_path, language="eng"):
+    """Add a subtitle file to an mp4 as a soft (mov_text) track, in place"""
+    tmp_path = video_path + ".subs.mp4"
+    try:
+        run_ffmpeg([
+            "-i", video_path, "-i", subtitles_path,
+            "-map", "0", "-map", "1:0",
+            "-c", "copy", "-c:s", "mov_text",
+            "-metadata:s:s:0", f"language={language}",
+            *faststart_args(),
+            tmp_path,
+        ])
+        os.replace(tmp_path, video_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return video_path
@@ -1,59 +1,264 @@
 import os
-import pyttsx3
+import math
+import time
+import wave
+import shutil
 import logging
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from cache_store import DiskCache, cache_key
+from ffmpeg_utils import run_ffmpeg
+from tts_backends import TTS_BACKENDS, BASE_RATE
+from metrics import registry, cpu_seconds
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("AudioGenerator")
 
-def generate_audio(script, topic):
-    os.makedirs("audio", exist_ok=True)
-    filename = f"audio/{topic.replace(' ', '_')}.mp3"
-    
+# "pyttsx3" (local, default), "edge" (edge-tts), "gtts" or "tone" (synthetic, for benchmarks)
+TTS_BACKEND = os.getenv("TTS_BACKEND", "pyttsx3")
+TTS_RATE = BASE_RATE    # Speed of speech
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# Every chunk is normalised to this PCM format so chunks can be joined sample-exactly
+CHUNK_SAMPLE_RATE = 24000
+
+# Synthesized sentences, keyed by (backend, text, voice, rate)
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", "cache/tts")
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_MB", "1024")) * 1024 * 1024
+TTS_CACHE_TTL = int(os.getenv("TTS_CACHE_TTL_HOURS", "720")) * 3600
+
+tts_cache = DiskCache(TTS_CACHE_DIR, TTS_CACHE_MAX_BYTES, TTS_CACHE_TTL, name="tts")
+
+class EnginePool:
+    """Worker processes that each hold one warm engine of a single TTS backend.
+
+    The voice is resolved once when the pool is created and handed to every
+    worker, so neither engine start-up nor voice selection is repeated per
+    job or per sentence.
+    """
+
+    def __init__(self, backend=TTS_BACKEND, workers=TTS_WORKERS, rate=TTS_RATE):
+        if backend not in TTS_BACKENDS:
+            raise ValueError(f"Unknown TTS backend {backend!r}; choose from {', '.join(TTS_BACKENDS)}")
+        self.backend = backend
+        self.rate = rate
+        self.voice = TTS_BACKENDS[backend].resolve_voice()
+        # Engines are not fork-safe once the parent has initialised one
+        self._executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_engine, initargs=(backend, self.voice, rate))
+        self.workers = workers
+
+    def warm(self):
+        """Start every worker (and its engine) now rather than on the first sentence"""
+        return [self._executor.submit(_ping) for _ in range(self.workers)]
+
+    def chunk_key(self, text):
+        return cache_key(self.backend, text, self.voice, self.rate)
+
+    def submit(self, key, text):
+        return self._executor.submit(_synthesize_chunk, key, text)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# Set in each pool worker by _init_engine
+_engine = None
+
+def _init_engine(backend, voice, rate):
+    global _engine
+    _engine = TTS_BACKENDS[backend](voice, rate)
+
+def _ping():
+    return _engine.name
+
+def _synthesize_chunk(key, text):
+    """Synthesize one sentence into the TTS cache (runs in a pool worker).
+
+    Returns (path, engine seconds, CPU seconds including the ffmpeg conversion);
+    the pool outlives jobs, so its CPU time is not in the job process's own.
+    """
+    work_dir = tempfile.mkdtemp(prefix="tts_")
+    cpu_start = cpu_seconds()
     try:
-        engine = pyttsx3.init()
-        
-        # Get available voices
-        voices = engine.getProperty("voices")
-        
-        # Try to select a female voice if available
-        female_voice = None
-        for i, v in enumerate(voices):
-            if "female" in v.name.lower() or "female" in v.id.lower() or "zira" in v.name.lower():
-                female_voice = v.id
-                logger.info(f"Selected female voice: {v.name}")
+        raw_path = os.path.join(work_dir, "chunk" + _engine.extension)
+        start = time.perf_counter()
+        _engine.synthesize(text, raw_path)
+        elapsed = time.perf_counter() - start
+        if not os.path.exists(raw_path) or os.path.getsize(raw_path) == 0:
+            raise RuntimeError(f"Generated audio for chunk is empty or missing: {text[:40]!r}")
+
+        def write(tmp_path):
+            run_ffmpeg(["-i", raw_path, "-ac", "1", "-ar", str(CHUNK_SAMPLE_RATE),
+                        "-c:a", "pcm_s16le", "-f", "wav", tmp_path])
+        path = tts_cache.put_file(key, write, ".wav")
+        return path, elapsed, cpu_seconds() - cpu_start
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def engine_pool():
+    """The process-wide engine pool for TTS_BACKEND, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = EnginePool()
+        return _pool
+
+def reset_engine_pool(broken):
+    """Drop a pool whose worker died (which breaks the whole pool) so the next engine_pool() starts afresh"""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown()
+
+def warm_tts_pool():
+    """Create the engine pool and start its workers without waiting for them"""
+    try:
+        engine_pool().warm()
+    except Exception as e:
+        logger.warning(f"Could not warm up the {TTS_BACKEND} TTS pool: {e}")
+
+def prefetch_sentence(text, in_flight):
+    """Start synthesizing one sentence before the narration is requested (e.g. while the script streams).
+
+    in_flight maps chunk key -> future; pass the same dict to
+    generate_narration, which picks the futures up instead of resubmitting.
+    """
+    try:
+        pool = engine_pool()
+        key = pool.chunk_key(text)
+        if key not in in_flight and not os.path.exists(tts_cache.path_for(key, ".wav")):
+            in_flight[key] = pool.submit(key, text)
+    except Exception as e:
+        logger.warning(f"Could not start early synthesis: {e}")
+
+def _record(backend, synth_seconds, audio_seconds, cpu):
+    registry.inc("vidai_tts_engine_seconds_total", synth_seconds, backend=backend)
+    registry.inc("vidai_tts_cpu_seconds_total", cpu, backend=backend)
+    registry.inc("vidai_tts_audio_seconds_total", audio_seconds, backend=backend)
+
+def wav_duration(path):
+    with wave.open(path, "rb") as f:
+        return f.getnframes() / f.getframerate()
+
+def concat_wavs(chunk_paths, output_path, frame_rate=None):
+    """Join same-format (16-bit PCM) WAV chunks sample-exactly; returns each chunk's duration in the result.
+
+    With frame_rate, every chunk is padded with silence to a whole number of
+    video frames, so the frames a sentence's segments get never depend on
+    the length of the sentences before it.
+    """
+    durations = []
+    with wave.open(output_path, "wb") as out:
+        for i, path in enumerate(chunk_paths):
+            with wave.open(path, "rb") as chunk:
+                if i == 0:
+                    out.setparams(chunk.getparams())
+                samples = chunk.getnframes()
+                out.writeframes(chunk.readframes(samples))
+                rate, frame_bytes = chunk.getframerate(), chunk.getsampwidth() * chunk.getnchannels()
+            if frame_rate:
+                padded = round(math.ceil(samples * frame_rate / rate) * rate / frame_rate)
+                out.writeframes(b"\0" * ((padded - samples) * frame_bytes))
+                samples = padded
+            durations.append(samples / rate)
+    return durations
+
+def _synthesize_sentences(pool, sentences, filename, on_progress, in_flight):
+    """Cached, already started or freshly synthesized chunk path for every sentence, in order"""
+    paths = [None] * len(sentences)
+    pending = {}
+    early = 0
+    for i, text in enumerate(sentences):
+        key = pool.chunk_key(text)
+        if key in in_flight:
+            pending[i] = in_flight.pop(key)
+            early += 1
+            continue
+        paths[i] = tts_cache.get_file(key, ".wav")
+        if paths[i] is None:
+            pending[i] = pool.submit(key, text)
+
+    logger.info(f"Generating audio to {filename} with {pool.backend} "
+                f"({len(sentences)} sentences, {len(sentences) - len(pending)} cached, {early} started early)")
+
+    def progress(done):
+        if on_progress:
+            on_progress(done, len(sentences))
+
+    done = len(sentences) - len(pending)
+    progress(done)
+    synth_seconds = audio_seconds = 0.0
+    for i, future in pending.items():
+        paths[i], elapsed, cpu = future.result()
+        duration = wav_duration(paths[i])
+        _record(pool.backend, elapsed, duration, cpu)
+        synth_seconds += elapsed
+        audio_seconds += duration
+        done += 1
+        progress(done)
+    if audio_seconds:
+        logger.info(f"{pool.backend} synthesized {audio_seconds:.1f}s of speech in {synth_seconds:.1f}s "
+                    f"of engine time (realtime factor {synth_seconds / audio_seconds:.2f})")
+    return paths
+
+def generate_narration(script, topic, on_progress=None, work_dir=None, in_flight=None, frame_rate=None):
+    """Synthesize script sentence by sentence in parallel and join the chunks.
+
+    Returns (audio_path, chunks) where each chunk is {"text", "start",
+    "duration"} in seconds, measured from the synthesized audio itself.
+    Unchanged sentences are served from the TTS cache. on_progress(done,
+    total) is called as sentences become available. The narration is
+    written to work_dir (a job's private scratch directory) or audio/.
+    in_flight holds sentences already submitted with prefetch_sentence.
+    With frame_rate, each sentence is padded to whole video frames (see
+    concat_wavs) so edits elsewhere in the script leave its cuts alone.
+    """
+    # Imported here so TTS worker processes don't load the script client
+    from generate_script import split_sentences
+
+    work_dir = work_dir or "audio"
+    os.makedirs(work_dir, exist_ok=True)
+    filename = os.path.join(work_dir, f"{topic.replace(' ', '_')}.wav")
+    in_flight = {} if in_flight is None else in_flight
+
+    try:
+        sentences = [s.strip() for s in split_sentences(script) if s.strip()]
+        if not sentences:
+            raise RuntimeError("Narration script is empty")
+        for attempt in (1, 2):
+            pool = engine_pool()
+            try:
+                paths = _synthesize_sentences(pool, sentences, filename, on_progress, in_flight)
                 break
-        
-        # If no female voice found, try to select a voice with ID containing 'en'
-        if not female_voice:
-            for v in voices:
-                if 'en' in v.id.lower():
-                    female_voice = v.id
-                    logger.info(f"Selected English voice: {v.name}")
-                    break
-        
-        # Set the voice if found, otherwise use default
-        if female_voice:
-            engine.setProperty("voice", female_voice)
-        else:
-            logger.warning("No suitable voice found, using default")
-            
-        # Adjust quality settings for better audio
-        engine.setProperty("rate", 150)     # Speed of speech
-        engine.setProperty("volume", 1.0)   # Volume (0.0 to 1.0)
-        
-        # Save to file
-        logger.info(f"Generating audio to {filename}")
-        engine.save_to_file(script, filename)
-        engine.runAndWait()
-        
-        if os.path.exists(filename) and os.path.getsize(filename) > 0:
-            logger.info("✅ Audio generated successfully.")
-            return filename
-        else:
-            logger.error("Audio file was created but is empty or missing")
-            raise RuntimeError("Generated audio file is empty or missing")
-            
+            except BrokenProcessPool:
+                # A worker died (crash or OOM kill); chunks that finished are already cached
+                reset_engine_pool(pool)
+                in_flight.clear()
+                if attempt == 2:
+                    raise
+                logger.warning("A TTS worker died; retrying on a fresh engine pool")
+
+        chunks = []
+        start = 0.0
+        for text, duration in zip(sentences, concat_wavs(paths, filename, frame_rate)):
+            chunks.append({"text": text, "start": start, "duration": duration})
+            start += duration
+
+        logger.info("✅ Audio generated successfully.")
+        return filename, chunks
+
     except Exception as e:
         logger.error(f"Failed to generate audio: {e}")
         raise RuntimeError(f"Audio generation failed: {e}")
+
+def generate_audio(script, topic):
+    audio_path, _ = generate_narration(script, topic)
+    return audio_path
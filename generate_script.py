@@ -1,73 +1,214 @@
 import requests
 import re
 import os
+import json
+import hashlib
 from dotenv import load_dotenv
+import http_client
+from cache_store import DiskCache, cache_key
+from video_search import normalize_topic
 
 load_dotenv()
 
 OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_API_URL = os.getenv("OPENROUTER_API_URL", "https://openrouter.ai/api/v1/chat/completions")
 
-def generate_script(topic):
-    url = "https://openrouter.ai/api/v1/chat/completions"
+MODEL = "openai/gpt-3.5-turbo"
+TEMPERATURE = 0.7
+SYSTEM_PROMPT = "You are a helpful assistant that generates educational scripts with narration and visual directions."
+
+# Parsed scripts are cached by (normalized topic, model, prompt template hash, temperature)
+SCRIPT_CACHE_DIR = os.getenv("SCRIPT_CACHE_DIR", "cache/scripts")
+SCRIPT_CACHE_MAX_BYTES = int(os.getenv("SCRIPT_CACHE_MAX_MB", "256")) * 1024 * 1024
+SCRIPT_CACHE_TTL = int(os.getenv("SCRIPT_CACHE_TTL_HOURS", "720")) * 3600
+
+script_cache = DiskCache(SCRIPT_CACHE_DIR, SCRIPT_CACHE_MAX_BYTES, SCRIPT_CACHE_TTL, grace=0, name="scripts")
+
+PROMPT_TEMPLATE = (
+    "Generate an educational narration script on topic '{topic}' for the length of ideal 5 to 10 mins as per the requirement of the topic.\n"
+    "Divide the script into two parts: 1st Narration Script and 2nd Visual Cues for Video Generation.\n"
+    "Narration Script should be 5 to 10 mins in length and it should not contain any kind of Tags or anything ese then the narration script itself, do not write anything else and strictly follow this not even the word Narrator or Narration script in the starting and do not include the word Visual Cue anywhere in the output."
+    "Keep it informative and engaging. Make it detailed and easy to understand."
+    "Make it engaging and informative, suitable for a general audience and everyone should be able to understand it easily."
+    "Include real-life examples where ever needed to explain complex concepts to help students.\n\n"
+    "Then provide an image direction script with visual cues in square brackets in the last do not start with Image Script or Visual Directions or anything else, just start with the image directions written in the square brackets."
+    "like [Indian Parliament], [Mughal architecture], that align with the narration. and remember to not include any kind of tags or anything else in the image script, just the image directions in square brackets and have to be in the last of the script after one line gap from narration script."
+)
+
+PROMPT_VERSION = hashlib.sha256((SYSTEM_PROMPT + PROMPT_TEMPLATE).encode("utf-8")).hexdigest()[:16]
+
+def script_cache_key(topic):
+    return cache_key(normalize_topic(topic), MODEL, PROMPT_VERSION, TEMPERATURE)
+
+def split_script(full_text):
+    """Split a completion into narration and image script at the first [visual cue]"""
+    match = re.search(r"\n?\[.*?\]", full_text)
+    if match:
+        split_index = match.start()
+        return full_text[:split_index].strip(), full_text[split_index:].strip()
+    return full_text, ""
+
+def split_sentences(script):
+    """Split narration into sentences; the stream parser and TTS chunking must agree exactly"""
+    return re.split(r"(?<=[.!?])\s+", script)
+
+class ScriptStreamParser:
+    """Incrementally turns streamed completion text into narration sentences and [cue] keywords.
+
+    Sentences are emitted once the next one has started; the first "[" ends
+    the narration, after which each complete [...] is emitted as a cue.
+    """
+
+    def __init__(self):
+        self.text = []
+        self._buffer = ""
+        self._in_cues = False
+
+    def feed(self, delta):
+        """Add a chunk of completion text; returns the (kind, value) events it completes"""
+        self.text.append(delta)
+        self._buffer += delta
+        events = []
+        if not self._in_cues:
+            bracket = self._buffer.find("[")
+            narration = self._buffer if bracket < 0 else self._buffer[:bracket]
+            parts = split_sentences(narration)
+            if bracket < 0:
+                complete, self._buffer = parts[:-1], parts[-1]
+            else:
+                complete, self._buffer = parts, self._buffer[bracket:]
+                self._in_cues = True
+            events += [("sentence", part.strip()) for part in complete if part.strip()]
+        if self._in_cues:
+            consumed = 0
+            for match in re.finditer(r"\[(.*?)\]", self._buffer):
+                events.append(("cue", match.group(1)))
+                consumed = match.end()
+            self._buffer = self._buffer[consumed:]
+        return events
+
+    def close(self):
+        """Flush the trailing sentence; returns (events, full_text)"""
+        events = []
+        if not self._in_cues and self._buffer.strip():
+            events.append(("sentence", self._buffer.strip()))
+        self._buffer = ""
+        return events, "".join(self.text).strip()
+
+def _replay(script):
+    """Events for an already complete script, in the order a stream would produce them"""
+    parser = ScriptStreamParser()
+    events = parser.feed(script["narration_script"] + "\n" + script["image_script"])
+    return events + parser.close()[0]
+
+def _completion_deltas(response):
+    """Content deltas of an OpenRouter completion, streamed (SSE) or not"""
+    if response.headers.get("Content-Type", "").startswith("application/json"):
+        # Endpoint ignored stream=true and sent the whole completion
+        res = response.json()
+        content = res.get("choices", [{}])[0].get("message", {}).get("content", "")
+        if not content:
+            print("🔍 Full response:", res)
+        yield content
+        return
+
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        # Blank keep-alives and ": OPENROUTER PROCESSING" comments carry no data
+        if not line or not line.startswith("data:"):
+            continue
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            break
+        chunk = json.loads(payload)
+        if "error" in chunk:
+            raise RuntimeError(chunk["error"].get("message", chunk["error"]))
+        choices = chunk.get("choices") or [{}]
+        delta = choices[0].get("delta", {}).get("content")
+        if delta:
+            yield delta
+
+def stream_script(topic, force_regenerate=False):
+    """Generate the script for topic, yielding events as the completion streams in.
+
+    Yields ("sentence", text) for each narration sentence and ("cue", keyword)
+    for each [visual cue] as soon as they are complete, then a final
+    ("script", {"narration_script", "image_script"}). Cached scripts are
+    replayed as the same events.
+    """
+    key = script_cache_key(topic)
+    if not force_regenerate:
+        cached = script_cache.get_json(key)
+        if cached is not None:
+            print("✅ Script loaded from cache.")
+            yield from _replay(cached)
+            yield ("script", cached)
+            return
 
     headers = {
         "Authorization": "Bearer " + OPENROUTER_API_KEY,
         "Content-Type": "application/json"
     }
 
-    user_prompt = (
-        f"Generate an educational narration script on topic '{topic}' for the length of ideal 5 to 10 mins as per the requirement of the topic.\n"
-        "Divide the script into two parts: 1st Narration Script and 2nd Visual Cues for Video Generation.\n"
-        "Narration Script should be 5 to 10 mins in length and it should not contain any kind of Tags or anything ese then the narration script itself, do not write anything else and strictly follow this not even the word Narrator or Narration script in the starting and do not include the word Visual Cue anywhere in the output."
-        "Keep it informative and engaging. Make it detailed and easy to understand."
-        "Make it engaging and informative, suitable for a general audience and everyone should be able to understand it easily."
-        "Include real-life examples where ever needed to explain complex concepts to help students.\n\n"
-        "Then provide an image direction script with visual cues in square brackets in the last do not start with Image Script or Visual Directions or anything else, just start with the image directions written in the square brackets."
-        "like [Indian Parliament], [Mughal architecture], that align with the narration. and remember to not include any kind of tags or anything else in the image script, just the image directions in square brackets and have to be in the last of the script after one line gap from narration script."
-    )
+    user_prompt = PROMPT_TEMPLATE.format(topic=topic)
 
     data = {
-        "model": "openai/gpt-3.5-turbo",
+        "model": MODEL,
         "messages": [
-            {"role": "system", "content": "You are a helpful assistant that generates educational scripts with narration and visual directions."},
+            {"role": "system", "content": SYSTEM_PROMPT},
             {"role": "user", "content": user_prompt}
         ],
-        "temperature": 0.7,
+        "temperature": TEMPERATURE,
         "top_p": 1.0,
-        "max_tokens": 5000
+        "max_tokens": 5000,
+        "stream": True
     }
 
+    empty = {"narration_script": "", "image_script": ""}
     try:
-        response = requests.post(url, headers=headers, json=data)
-        response.raise_for_status()
-        res = response.json()
-
-        full_text = res.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+        parser = ScriptStreamParser()
+        with http_client.post(OPENROUTER_API_URL, route="chat/completions", headers=headers, json=data,
+                              stream=True) as response:
+            response.raise_for_status()
+            for delta in _completion_deltas(response):
+                yield from parser.feed(delta)
+        events, full_text = parser.close()
+        yield from events
 
         if not full_text:
             print("❌ Warning: Empty response from model.")
-            print("🔍 Full response:", res)
-            return {"narration_script": "", "image_script": ""}
-
-        # Find where the first square bracketed visual cue appears
-        match = re.search(r"\n?\[.*?\]", full_text)
-        if match:
-            split_index = match.start()
-            narration_script = full_text[:split_index].strip()
-            image_script = full_text[split_index:].strip()
-        else:
-            narration_script = full_text
-            image_script = ""
+            yield ("script", empty)
+            return
+
+        narration_script, image_script = split_script(full_text)
 
         print("✅ Script generated successfully.")
-        return {
+        script = {
             "narration_script": narration_script,
             "image_script": image_script
         }
+        if narration_script:
+            script_cache.put_json(key, script)
+        yield ("script", script)
+        return
 
     except requests.exceptions.RequestException as e:
         print("❌ Network error:", e)
     except Exception as e:
         print("❌ Unexpected error:", e)
 
-    return {"narration_script": "", "image_script": ""}
+    yield ("script", empty)
+
+def generate_script(topic, force_regenerate=False, on_event=None):
+    """Return {"narration_script", "image_script"} for topic.
+
+    Results are served from the script cache when possible; force_regenerate
+    skips the lookup (the fresh script still replaces the cached one).
+    on_event(kind, value) receives each "sentence" and "cue" event while the
+    completion is still streaming.
+    """
+    for kind, value in stream_script(topic, force_regenerate):
+        if kind == "script":
+            return value
+        if on_event:
+            on_event(kind, value)
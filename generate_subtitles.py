@@ -1,13 +1,139 @@
 import os
+import re
+import numpy as np
+from ffmpeg_utils import decode_audio
 
-def generate_subtitles(script, output_path="output/subtitles.srt"):
-    os.makedirs("output", exist_ok=True)
-    lines = script.strip().split(". ")
-    with open(output_path, "w") as f:
-        for i, line in enumerate(lines):
-            start_time = i * 4
-            end_time = (i + 1) * 4
-            f.write(f"{i+1}\n")
-            f.write(f"00:00:{start_time:02d},000 --> 00:00:{end_time:02d},000\n")
-            f.write(line.strip() + "\n\n")
-    return output_path
+# Energy-based alignment: 10 ms analysis frames, pauses of at least 120 ms
+# that are 35 dB below the loud speech level
+ALIGN_SAMPLE_RATE = 16000
+ALIGN_FRAME = 0.01
+SILENCE_DB = -35.0
+MIN_PAUSE = 0.12
+# How far a cue boundary may move to land in a pause
+SNAP_WINDOW = 1.5
+
+def _cue_weight(text):
+    # Speaking time is roughly proportional to letters plus a little per word
+    return len(re.sub(r"\W", "", text)) + 2 * len(text.split()) or 1
+
+def split_caption(text, max_words=14):
+    """Split one sentence into near-equal pieces of at most max_words words"""
+    words = text.split()
+    if not words:
+        return []
+    pieces = -(-len(words) // max_words)
+    size = -(-len(words) // pieces)
+    return [" ".join(words[i:i + size]) for i in range(0, len(words), size)]
+
+def cues_from_chunks(chunks, max_words=14):
+    """(start, end, text) cues from synthesized sentence chunks ({"text", "start", "duration"}).
+
+    Sentence boundaries come straight from the audio; long sentences are
+    split into caption-sized pieces that share the sentence's time by length.
+    """
+    cues = []
+    for chunk in chunks:
+        pieces = split_caption(chunk["text"], max_words)
+        weights = [_cue_weight(piece) for piece in pieces]
+        t = chunk["start"]
+        for piece, weight in zip(pieces, weights):
+            duration = chunk["duration"] * weight / sum(weights)
+            cues.append((t, t + duration, piece))
+            t += duration
+    return cues
+
+def cue_sentences(chunks, max_words=14):
+    """Index of the sentence chunk each cue of cues_from_chunks(chunks, max_words) comes from"""
+    return [i for i, chunk in enumerate(chunks) for _ in split_caption(chunk["text"], max_words)]
+
+def find_pauses(samples, sample_rate=ALIGN_SAMPLE_RATE):
+    """Speech span and pause midpoints (seconds) of a mono waveform.
+
+    Returns (speech_start, speech_end, pauses).
+    """
+    frame = max(1, int(sample_rate * ALIGN_FRAME))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return 0.0, len(samples) / sample_rate, np.zeros(0)
+    frames = samples[:n_frames * frame].astype(np.float32).reshape(n_frames, frame)
+    energy = np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-6
+    reference = np.percentile(energy, 95)
+    silent = 20 * np.log10(energy / reference) < SILENCE_DB
+
+    voiced = np.flatnonzero(~silent)
+    if not len(voiced):
+        return 0.0, n_frames * ALIGN_FRAME, np.zeros(0)
+
+    # Runs of silent frames: edges where the silent flag flips
+    padded = np.concatenate(([False], silent, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    long_enough = (ends - starts) * ALIGN_FRAME >= MIN_PAUSE
+    inside = (starts > voiced[0]) & (ends <= voiced[-1])
+    pauses = (starts + ends)[long_enough & inside] / 2 * ALIGN_FRAME
+    return voiced[0] * ALIGN_FRAME, (voiced[-1] + 1) * ALIGN_FRAME, pauses
+
+def align_to_audio(texts, audio_path):
+    """(start, end, text) cues for texts, timed against the narration waveform.
+
+    Boundaries are first placed in proportion to text length across the
+    spoken part of the audio, then snapped to the nearest pause.
+    """
+    samples = decode_audio(audio_path, ALIGN_SAMPLE_RATE)
+    total = len(samples) / ALIGN_SAMPLE_RATE
+    speech_start, speech_end, pauses = find_pauses(samples)
+
+    weights = np.array([_cue_weight(text) for text in texts], dtype=np.float64)
+    ideal = speech_start + (speech_end - speech_start) * np.cumsum(weights)[:-1] / weights.sum()
+
+    boundaries = [0.0]
+    for i, target in enumerate(ideal):
+        lower = boundaries[-1] + 0.3
+        # Leave room for the cues still to come
+        upper = speech_end - 0.3 * (len(ideal) - i)
+        candidates = pauses[(pauses > lower) & (pauses < upper) & (np.abs(pauses - target) <= SNAP_WINDOW)]
+        if len(candidates):
+            boundary = float(candidates[np.argmin(np.abs(candidates - target))])
+        else:
+            boundary = float(min(max(target, lower), max(lower, upper)))
+        boundaries.append(boundary)
+    boundaries.append(total)
+    return [(boundaries[i], boundaries[i + 1], text) for i, text in enumerate(texts)]
+
+def _timestamp(seconds, separator):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{millis:03d}"
+
+def write_srt(cues, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for i, (start, end, text) in enumerate(cues, start=1):
+            f.write(f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text.strip()}\n\n")
+    return path
+
+def write_vtt(cues, path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("WEBVTT\n\n")
+        for start, end, text in cues:
+            f.write(f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text.strip()}\n\n")
+    return path
+
+def export_subtitles(cues, video_path):
+    """Write .srt and .vtt sidecars next to video_path; returns their paths"""
+    base = os.path.splitext(video_path)[0]
+    return write_srt(cues, base + ".srt"), write_vtt(cues, base + ".vtt")
+
+def generate_subtitles(script, output_path="output/subtitles.srt", chunks=None, audio_path=None):
+    """Write an SRT for script, timed from TTS chunks, else the narration audio, else 4 s per sentence"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    if chunks:
+        cues = cues_from_chunks(chunks)
+    else:
+        lines = [line.strip() for line in script.strip().split(". ") if line.strip()]
+        if audio_path:
+            cues = align_to_audio(lines, audio_path)
+        else:
+            cues = [(i * 4, (i + 1) * 4, line) for i, line in enumerate(lines)]
+    return write_srt(cues, output_path)
@@ -0,0 +1,72 @@
+import os
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from dotenv import load_dotenv
+from metrics import registry
+
+load_dotenv()
+
+# Shared HTTP settings for the Pexels and OpenRouter clients
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "60"))
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def _build_session():
+    retry = Retry(
+        total=HTTP_MAX_RETRIES,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=None,               # OpenRouter uses POST; 429/5xx are safe to resend
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        backoff_max=30,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=retry)
+    s = requests.Session()
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+session = _build_session()
+
+def _labels(method, url, route):
+    # A fixed route class rather than the path: asset URLs are unique per file and
+    # would add series to /metrics for every download, for the life of the server
+    return {"method": method, "host": urlparse(url).netloc, "route": route}
+
+def _record(labels, elapsed, error):
+    registry.observe("vidai_http_request_seconds", elapsed, **labels)
+    if error:
+        registry.inc("vidai_http_errors_total", **labels)
+
+def request(method, url, route="other", **kwargs):
+    """Send a request through the pooled session with default timeouts and retries.
+
+    route names the kind of request (e.g. "videos/search", "download") for
+    the latency metrics. Latency is measured to the response headers, so
+    streamed downloads are recorded as time-to-first-byte.
+    """
+    kwargs.setdefault("timeout", (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT))
+    labels = _labels(method, url, route)
+    start = time.perf_counter()
+    try:
+        response = session.request(method, url, **kwargs)
+    except Exception:
+        _record(labels, time.perf_counter() - start, True)
+        raise
+    _record(labels, time.perf_counter() - start, response.status_code >= 400)
+    return response
+
+def get(url, route="other", **kwargs):
+    return request("GET", url, route, **kwargs)
+
+def post(url, route="other", **kwargs):
+    return request("POST", url, route, **kwargs)
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import multiprocessing
+from uuid import uuid4
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from video_search import normalize_topic
+
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "output/jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "20"))
+
+ACTIVE_STATES = ("queued", "running")
+
+class QueueFull(Exception):
+    """Raised when admission control rejects a new job"""
+
+# Set in each worker process by _init_worker
+_events = None
+
+def _init_worker(events):
+    global _events
+    _events = events
+    # Start TTS engines while the worker waits for its first job
+    from generate_audio import warm_tts_pool
+    warm_tts_pool()
+
+def _run_job(job_id, topic, options):
+    """Run one generation job inside a worker process, streaming events back to the server"""
+    from pipeline import run_pipeline
+
+    def progress(step, message, percentage, **extra):
+        _events.put((job_id, "progress", dict(extra, step=step, message=message, percentage=percentage)))
+
+    def preview(path):
+        _events.put((job_id, "preview", {"path": path}))
+
+    video_path, report = run_pipeline(topic, progress=progress, on_preview=preview, **options)
+    if video_path is None:
+        raise RuntimeError("Failed to generate script. Please try again.")
+    return {"path": video_path, "topic": topic, "report": report}
+
+class JobQueue:
+    """Durable job queue backed by SQLite, drained by a bounded pool of worker processes.
+
+    Jobs survive restarts: anything still marked running when the queue starts
+    is put back in the queue. Identical requests (same normalized topic and
+    options) that arrive while a job is queued or running share that job.
+    on_event(job, event, payload, subscribers) is called from background
+    threads for "queued", "started", "progress", "preview", "done" and
+    "failed" events.
+    """
+
+    def __init__(self, on_event, db_path=JOBS_DB_PATH, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING):
+        self.on_event = on_event
+        self.db_path = db_path
+        self.workers = workers
+        self.max_pending = max_pending
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(workers)
+        self._wakeup = threading.Event()
+        self._executor = None
+        self._started = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    dedupe_key TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    result TEXT,
+                    error TEXT
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status)")
+            # Jobs interrupted by a restart go back in the queue
+            conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE status = 'running'")
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self._init_db()
+        self._context = multiprocessing.get_context("spawn")
+        self._events = self._context.Queue()
+        self._executor = self._new_executor()
+        threading.Thread(target=self._relay_events, args=(self._events,), daemon=True).start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=self._context,
+                                   initializer=_init_worker, initargs=(self._events,))
+
+    def _replace_executor(self, broken):
+        """Swap in a fresh worker pool once a worker has died (e.g. OOM-killed), which breaks the whole pool"""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            print("⚠️ A job worker process died; starting a new worker pool")
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False)
+
+    def submit(self, topic, options, subscriber):
+        """Queue a job (or join an identical active one); returns (job_id, deduped)"""
+        self.start()
+        dedupe_key = f"{normalize_topic(topic)}|{json.dumps(options, sort_keys=True)}"
+        with self._lock, self._connect() as conn:
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (dedupe_key, *ACTIVE_STATES)).fetchone()
+            if existing:
+                job_id = existing["id"]
+                self._subscribers.setdefault(job_id, set()).add(subscriber)
+                deduped = True
+            else:
+                pending = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+                if pending >= self.max_pending:
+                    raise QueueFull(f"The server is busy ({pending} videos waiting). Please try again in a few minutes.")
+                job_id = uuid4().hex
+                conn.execute(
+                    "INSERT INTO jobs (id, topic, dedupe_key, options, status, created_at) VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (job_id, topic, dedupe_key, json.dumps(options), time.time()))
+                self._subscribers[job_id] = {subscriber}
+                deduped = False
+
+        self._broadcast_positions()
+        self._wakeup.set()
+        return job_id, deduped
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def queue_positions(self):
+        """1-based position of every queued job"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at").fetchall()
+        return {row["id"]: position for position, row in enumerate(rows, start=1)}
+
+    def status_counts(self):
+        """Number of jobs in each status"""
+        if not os.path.exists(self.db_path):
+            return {}
+        with self._connect() as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def _notify(self, job_id, event, payload):
+        with self._lock:
+            subscribers = set(self._subscribers.get(job_id, ()))
+        try:
+            self.on_event(job_id, event, payload, subscribers)
+        except Exception as e:
+            print(f"⚠️ Error delivering {event} for job {job_id}: {e}")
+
+    def _broadcast_positions(self):
+        for job_id, position in self.queue_positions().items():
+            self._notify(job_id, "queued", {"queue_position": position})
+
+    def _claim_next(self):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?", (time.time(), row["id"]))
+            return dict(row)
+
+    def _dispatch(self):
+        while True:
+            self._slots.acquire()
+            job = self._claim_next()
+            if job is None:
+                self._slots.release()
+                self._wakeup.wait(timeout=5)
+                self._wakeup.clear()
+                continue
+
+            executor = self._executor
+            try:
+                future = executor.submit(_run_job, job["id"], job["topic"], json.loads(job["options"]))
+            except BrokenProcessPool:
+                # Put the job back at the head of the queue and retry on a fresh pool
+                self._replace_executor(executor)
+                with self._lock, self._connect() as conn:
+                    conn.execute("UPDATE jobs SET status = 'queued', started_at = NULL WHERE id = ?", (job["id"],))
+                self._slots.release()
+                continue
+            self._notify(job["id"], "started", {})
+            self._broadcast_positions()
+            future.add_done_callback(lambda f, job_id=job["id"], executor=executor: self._finished(job_id, f, executor))
+
+    def _finished(self, job_id, future, executor):
+        try:
+            result = future.result()
+            status, error = "done", None
+        except BrokenProcessPool:
+            result, status, error = None, "failed", "The worker running this job stopped unexpectedly. Please try again."
+            self._replace_executor(executor)
+        except Exception as e:
+            result, status, error = None, "failed", str(e)
+
+        with self._lock, self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                         (status, time.time(), json.dumps(result) if result else None, error, job_id))
+
+        if status == "done":
+            self._notify(job_id, "done", result)
+        else:
+            self._notify(job_id, "failed", {"message": error})
+        with self._lock:
+            self._subscribers.pop(job_id, None)
+
+        self._slots.release()
+        self._wakeup.set()
+
+    def _relay_events(self, events):
+        while True:
+            job_id, event, payload = events.get()
+            self._notify(job_id, event, payload)
@@ -0,0 +1,61 @@
+import os
+import random
+import numpy as np
+from PIL import Image, ImageOps
+from moviepy.editor import VideoClip
+
+# Resampling filter for the per-frame crop-and-scale: "bilinear" is fastest,
+# "lanczos" is sharper at a higher CPU cost.
+KEN_BURNS_QUALITY = os.getenv("KEN_BURNS_QUALITY", "bilinear")
+
+RESAMPLING = {
+    "bilinear": Image.Resampling.BILINEAR,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+# The source is decoded slightly larger than the frame (800px tall for 720p)
+# so the first frame is already a little zoomed in and there is room to pan.
+OVERSCAN = 800 / 720
+
+def load_source(img_path, size):
+    """Decode img_path once and cover-scale it to size * OVERSCAN"""
+    width, height = size
+    target = (int(round(width * OVERSCAN)), int(round(height * OVERSCAN)))
+    with Image.open(img_path) as img:
+        return ImageOps.fit(img.convert("RGB"), target, Image.Resampling.LANCZOS)
+
+class KenBurnsClip(VideoClip):
+    """Slow zoom into a still image, rendered from one pre-scaled buffer.
+
+    Each frame is a single crop-and-scale of the decoded source (Pillow's
+    box resize), so nothing is re-decoded and the full frame is never
+    resized and re-cropped per frame the way ImageClip.resize does it.
+    """
+
+    def __init__(self, img_path, duration, size=(1280, 720), zoom_factor=None,
+                 pan=None, quality=None):
+        self.quality = quality or KEN_BURNS_QUALITY
+        self._resample = RESAMPLING[self.quality]
+        self.zoom_factor = zoom_factor or random.uniform(1.1, 1.3)
+        pan_x, pan_y = pan or (random.uniform(0, 1), random.uniform(0, 1))
+
+        self._source = load_source(img_path, size)
+
+        width, height = size
+        src_w, src_h = self._source.size
+        # Window of the first frame, zoomed towards its centre over the clip
+        self._center = (pan_x * (src_w - width) + width / 2, pan_y * (src_h - height) + height / 2)
+        self._out_size = size
+        self._zoom_duration = duration
+
+        VideoClip.__init__(self, make_frame=self._make_frame, duration=duration)
+
+    def window(self, t):
+        zoom = 1 + (self.zoom_factor - 1) * min(max(t / self._zoom_duration, 0), 1)
+        half_w = self._out_size[0] / zoom / 2
+        half_h = self._out_size[1] / zoom / 2
+        cx, cy = self._center
+        return (cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+
+    def _make_frame(self, t):
+        return np.asarray(self._source.resize(self._out_size, self._resample, box=self.window(t)))
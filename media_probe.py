@@ -0,0 +1,164 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import threading
+import subprocess
+from concurrent.futures import Future, ThreadPoolExecutor
+from PIL import Image
+from cache_store import DiskCache, cache_key
+from ffmpeg_utils import FFMPEG_BINARY, run_ffmpeg
+from fetch_media import MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_MAX_AGE
+
+# ffprobe is optional: imageio-ffmpeg only ships ffmpeg, whose banner is parsed instead
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY") or shutil.which("ffprobe")
+NORMALIZE_WORKERS = int(os.getenv("NORMALIZE_WORKERS", "0")) or max(1, (os.cpu_count() or 1) // 2)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.avi', '.mkv', '.webm')
+
+probe_cache = DiskCache(os.path.join(MEDIA_CACHE_DIR, "probe"), 64 * 1024 * 1024, MEDIA_CACHE_MAX_AGE)
+normalized_cache = DiskCache(os.path.join(MEDIA_CACHE_DIR, "normalized"), MEDIA_CACHE_MAX_BYTES, MEDIA_CACHE_MAX_AGE)
+
+_digests = {}
+_digests_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+def content_hash(path):
+    """sha256 of a file's bytes, remembered per (path, size, mtime)"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        if memo_key in _digests:
+            return _digests[memo_key]
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    with _digests_lock:
+        _digests[memo_key] = digest.hexdigest()
+    return _digests[memo_key]
+
+def _ffprobe(path):
+    result = subprocess.run(
+        [FFPROBE_BINARY, "-v", "error", "-select_streams", "v:0", "-print_format", "json",
+         "-show_entries", "stream=codec_name,width,height,avg_frame_rate:format=duration", path],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffprobe failed: {result.stderr.decode('utf-8', 'replace').strip()}")
+    data = json.loads(result.stdout)
+    stream = data["streams"][0]
+    num, _, den = stream.get("avg_frame_rate", "0/1").partition("/")
+    return {
+        "codec": stream.get("codec_name"),
+        "width": stream["width"],
+        "height": stream["height"],
+        "fps": float(num) / float(den or 1) if float(den or 1) else None,
+        "duration": float(data.get("format", {}).get("duration") or 0),
+    }
+
+def _ffmpeg_banner(path):
+    result = subprocess.run([FFMPEG_BINARY, "-hide_banner", "-i", path], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    banner = result.stderr.decode("utf-8", "replace")
+    stream = re.search(r"Stream #\S+.*?: Video: (\w+).*?, (\d{2,5})x(\d{2,5})", banner)
+    if not stream:
+        raise RuntimeError(f"No video stream found in {path}")
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", banner)
+    fps = re.search(r"([\d.]+) fps", banner)
+    return {
+        "codec": stream.group(1),
+        "width": int(stream.group(2)),
+        "height": int(stream.group(3)),
+        "fps": float(fps.group(1)) if fps else None,
+        "duration": (int(duration.group(1)) * 3600 + int(duration.group(2)) * 60 + float(duration.group(3))) if duration else 0.0,
+    }
+
+def probe(path):
+    """Width, height, duration, codec and fps of a media file, cached by content hash.
+
+    Images report kind "image" and no duration; videos kind "video".
+    """
+    key = cache_key("probe", content_hash(path))
+    info = probe_cache.get_json(key)
+    if info is not None:
+        return info
+
+    if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        info = _ffprobe(path) if FFPROBE_BINARY else _ffmpeg_banner(path)
+        info["kind"] = "video"
+    else:
+        with Image.open(path) as img:
+            info = {"kind": "image", "width": img.width, "height": img.height,
+                    "codec": img.format, "fps": None, "duration": None}
+    info["portrait"] = info["height"] > info["width"]
+    probe_cache.put_json(key, info)
+    return info
+
+def normalize_video(path, size=(1280, 720), fps=24):
+    """Landscape video transcoded to a size/fps intermediate (cover-scaled and centre-cropped).
+
+    Clips that already match are returned as they are; portrait clips are
+    left alone for the caller to handle. Results are cached by content hash.
+    """
+    info = probe(path)
+    width, height = size
+    if info["portrait"] or ((info["width"], info["height"]) == (width, height)
+                            and info["fps"] and abs(info["fps"] - fps) < 0.01 and info["codec"] == "h264"):
+        return path
+
+    key = cache_key("normalized", content_hash(path), width, height, fps)
+    cached = normalized_cache.get_file(key, ".mp4")
+    if cached is not None:
+        return cached
+
+    def write(tmp_path):
+        run_ffmpeg([
+            "-i", path, "-an",
+            "-vf", f"scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},fps={fps},setsar=1",
+            "-c:v", "libx264", "-preset", "veryfast", "-crf", "18", "-pix_fmt", "yuv420p",
+            "-f", "mp4", tmp_path,
+        ])
+    return normalized_cache.put_file(key, write, ".mp4")
+
+def normalize_media(path, size=(1280, 720), fps=24):
+    """normalize_video for videos; other media is returned unchanged"""
+    if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        try:
+            return normalize_video(path, size, fps)
+        except Exception as e:
+            print(f"⚠️ Could not normalize {path}: {e}")
+    return path
+
+def _normalize_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=NORMALIZE_WORKERS, thread_name_prefix="normalize")
+        return _executor
+
+def submit_normalize(paths_future, size=(1280, 720), fps=24):
+    """Chain normalization onto a media-fetch future; returns a future of normalized paths.
+
+    Transcodes run on a shared pool as soon as each download finishes, so
+    they overlap with other downloads and with each other.
+    """
+    result = Future()
+
+    def forward(task):
+        try:
+            result.set_result(task.result())
+        except Exception as e:
+            result.set_exception(e)
+
+    def start(done):
+        try:
+            paths = done.result()
+        except Exception as e:
+            result.set_exception(e)
+            return
+        task = _normalize_executor().submit(lambda: [normalize_media(p, size, fps) for p in paths])
+        task.add_done_callback(forward)
+
+    paths_future.add_done_callback(start)
+    return result
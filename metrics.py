@@ -0,0 +1,274 @@
+import os
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+class Metrics:
+    """Process-wide counters and count/sum summaries, exportable in Prometheus text format.
+
+    Jobs run in worker processes, so each job takes the delta of its own
+    process's metrics (snapshot/delta) and the web server merges it into
+    its registry.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._summaries = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            count, total = self._summaries.get(key, (0, 0.0))
+            self._summaries[key] = (count + 1, total + value)
+
+    def total(self, name, **labels):
+        """Sum of a counter over every label set that includes labels"""
+        wanted = set(self._key(name, labels)[1])
+        with self._lock:
+            return sum(value for (n, l), value in self._counters.items() if n == name and wanted <= set(l))
+
+    def mean(self, name, **labels):
+        with self._lock:
+            count, total = self._summaries.get(self._key(name, labels), (0, 0.0))
+        return total / count if count else None
+
+    def snapshot(self):
+        """JSON-friendly copy of every metric"""
+        with self._lock:
+            return {
+                "counters": [[name, dict(labels), value] for (name, labels), value in self._counters.items()],
+                "summaries": [[name, dict(labels), count, total] for (name, labels), (count, total) in self._summaries.items()],
+            }
+
+    def delta(self, before):
+        """What changed since an earlier snapshot(), in the same shape"""
+        old_counters = {self._key(name, labels): value for name, labels, value in before["counters"]}
+        old_summaries = {self._key(name, labels): (count, total) for name, labels, count, total in before["summaries"]}
+        now = self.snapshot()
+        counters = [[name, labels, value - old_counters.get(self._key(name, labels), 0)]
+                    for name, labels, value in now["counters"]]
+        summaries = []
+        for name, labels, count, total in now["summaries"]:
+            old_count, old_total = old_summaries.get(self._key(name, labels), (0, 0.0))
+            summaries.append([name, labels, count - old_count, total - old_total])
+        return {"counters": [c for c in counters if c[2]], "summaries": [s for s in summaries if s[2]]}
+
+    def merge(self, snapshot):
+        """Add a snapshot or delta from another process"""
+        for name, labels, value in snapshot.get("counters", []):
+            self.inc(name, value, **labels)
+        with self._lock:
+            for name, labels, count, total in snapshot.get("summaries", []):
+                key = self._key(name, labels)
+                old_count, old_total = self._summaries.get(key, (0, 0.0))
+                self._summaries[key] = (old_count + count, old_total + total)
+
+    def prometheus(self, gauges=()):
+        """Prometheus text exposition; gauges are extra (name, labels, value) read at scrape time"""
+        def series(name, labels, value):
+            label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            return f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}"
+
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            summaries = sorted(self._summaries.items())
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(series(name, labels, value))
+        for (name, labels), (count, total) in summaries:
+            if name not in typed:
+                lines.append(f"# TYPE {name} summary")
+                typed.add(name)
+            lines.append(series(name + "_count", labels, count))
+            lines.append(series(name + "_sum", labels, round(total, 6)))
+        for name, labels, value in gauges:
+            if name not in typed:
+                lines.append(f"# TYPE {name} gauge")
+                typed.add(name)
+            lines.append(series(name, tuple(sorted(labels.items())), value))
+        return "\n".join(lines) + "\n"
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+registry = Metrics()
+
+def cpu_seconds():
+    """CPU time of this process plus its finished child processes (ffmpeg, pools)"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+def reset_peak_rss():
+    """Restart this process's peak-RSS mark (Linux), so peak_rss_bytes() covers one job"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def peak_rss_bytes():
+    """Peak resident memory since reset_peak_rss() (Linux), else over the process lifetime"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, KiB elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+class StageTimer:
+    """Wall-clock start/end (and CPU time) of each pipeline stage, relative to the job start.
+
+    Finished stages are also recorded in the registry as vidai_stage_seconds
+    and vidai_stage_cpu_seconds.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return time.perf_counter() - self.origin
+
+    def start(self, name):
+        with self._lock:
+            self.stages[name] = {"start": self._now(), "end": None, "cpu": None}
+
+    def end(self, name, cpu=None):
+        with self._lock:
+            times = self.stages[name]
+            times["end"] = self._now()
+            times["cpu"] = cpu
+        registry.observe("vidai_stage_seconds", times["end"] - times["start"], stage=name)
+        if cpu is not None:
+            registry.observe("vidai_stage_cpu_seconds", cpu, stage=name)
+
+    @contextmanager
+    def stage(self, name, worker_cpu=None):
+        """Time a stage run in this block; worker_cpu() adds CPU seconds spent in long-lived
+        worker processes (e.g. the TTS pool), which cpu_seconds() only sees once they exit"""
+        self.start(name)
+        cpu_start = cpu_seconds()
+        try:
+            yield
+        finally:
+            self.end(name, cpu_seconds() - cpu_start + (worker_cpu() if worker_cpu else 0))
+
+    def track_futures(self, name, futures):
+        """Time a background stage that is done when all futures are (keeps an earlier start)"""
+        if name not in self.stages:
+            self.start(name)
+        pending = [len(futures)]
+        if not futures:
+            self.end(name)
+
+        def done(_):
+            with self._lock:
+                pending[0] -= 1
+                finished = pending[0] == 0
+            if finished:
+                self.end(name)
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def report(self):
+        def rounded(value):
+            return round(value, 3) if value is not None else None
+
+        with self._lock:
+            return {
+                name: {
+                    "start": rounded(times["start"]),
+                    "end": rounded(times["end"]),
+                    "duration": rounded(times["end"] - times["start"]) if times["end"] is not None else None,
+                    "cpu": rounded(times["cpu"]),
+                }
+                for name, times in self.stages.items()
+            }
+
+    def print_report(self):
+        print("\n⏱️ Stage timings (seconds from job start):")
+        for name, times in sorted(self.report().items(), key=lambda item: item[1]["start"]):
+            end = f"{times['end']:8.2f}" if times["end"] is not None else "     ..."
+            duration = f"{times['duration']:8.2f}" if times["duration"] is not None else "     ..."
+            cpu = f"  cpu {times['cpu']:.2f}" if times["cpu"] is not None else ""
+            print(f"   {name:<10} {times['start']:8.2f} → {end}  ({duration}){cpu}")
+
+# Share of the progress bar per stage before there are measured durations to go by
+STAGE_WEIGHTS = {"script": 15.0, "audio": 20.0, "video": 65.0}
+
+class ProgressTracker:
+    """Turns the measured fraction of work done in each stage into one job percentage.
+
+    Each stage's share of the bar is its mean wall time over earlier jobs in
+    this process (vidai_stage_seconds), falling back to STAGE_WEIGHTS. The
+    percentage never goes backwards.
+    """
+
+    def __init__(self, callback, start=10, end=99):
+        self.callback = callback
+        weights = {stage: registry.mean("vidai_stage_seconds", stage=stage) or weight
+                   for stage, weight in STAGE_WEIGHTS.items()}
+        scale = (end - start) / sum(weights.values())
+        self.spans = {}
+        offset = start
+        for stage, weight in weights.items():
+            self.spans[stage] = (offset, weight * scale)
+            offset += weight * scale
+        self.percentage = start
+        self._last = None
+
+    def update(self, stage, fraction, step, message, **extra):
+        offset, width = self.spans[stage]
+        self.percentage = max(self.percentage, int(offset + width * min(1.0, max(0.0, fraction))))
+        # Per-frame updates only go out when the bar actually moves
+        if not extra and (step, self.percentage) == self._last:
+            return
+        self._last = (step, self.percentage)
+        if self.callback:
+            self.callback(step, message, self.percentage, **extra)
+
+def job_summary(metrics):
+    """Headline numbers of a job's metrics delta: bytes downloaded, cache hit rates, frames/sec, reused segments, peak RSS"""
+    counters = {}
+    for name, labels, value in metrics["counters"]:
+        counters.setdefault(name, []).append((labels, value))
+    summaries = {}
+    for name, labels, count, total in metrics["summaries"]:
+        summaries.setdefault(name, []).append((labels, count, total))
+
+    summary = {"download_bytes": sum(value for _, value in counters.get("vidai_download_bytes_total", []))}
+    caches = {}
+    for labels, value in counters.get("vidai_cache_requests_total", []):
+        entry = caches.setdefault(labels["cache"], {"hits": 0, "misses": 0})
+        entry["hits" if labels["result"] == "hit" else "misses"] += value
+    summary["cache"] = caches
+    frames = sum(value for _, value in counters.get("vidai_frames_encoded_total", []))
+    render_seconds = sum(total for _, _, total in summaries.get("vidai_render_seconds", []))
+    summary["frames_encoded"] = frames
+    summary["encode_fps"] = round(frames / render_seconds, 2) if render_seconds else None
+    summary["segments_reused"] = sum(value for _, value in counters.get("vidai_segments_reused_total", []))
+    peak = [total / count for _, count, total in summaries.get("vidai_job_peak_rss_bytes", []) if count]
+    summary["peak_rss_mb"] = round(max(peak) / (1024 * 1024), 1) if peak else None
+    return summary
@@ -0,0 +1,109 @@
+import shutil
+from generate_script import generate_script
+from generate_audio import generate_narration, prefetch_sentence
+from create_video import create_video, extract_keywords, new_work_dir, VIDEO_FPS
+from fetch_media import submit_prefetch
+from media_probe import probe
+from metrics import registry, StageTimer, ProgressTracker, job_summary, reset_peak_rss, peak_rss_bytes
+
+# Typical narration length in sentences, to size the script's share of the progress bar
+EXPECTED_SCRIPT_SENTENCES = 60
+
+def run_pipeline(topic, progress=None, regenerate_script=False, **render_options):
+    """Generate a video for topic with overlapping stages.
+
+    The script is streamed: each narration sentence goes to the TTS pool and
+    media for every [cue] keyword starts downloading in the background the
+    moment it is complete, and downloads keep going while the narration is
+    synthesized; the render then consumes each asset as it arrives.
+    progress(step, message, percentage, **extra) is called as work completes
+    (streamed sentences/cues, synthesized sentences, encoded frames or
+    segments), with percentages weighted by measured stage times.
+    regenerate_script bypasses the script cache. Returns (video_path, report)
+    where report has per-stage wall/CPU times ("stages"), headline numbers
+    including the rendered length ("summary") and the job's metrics delta
+    ("metrics"); video_path is None
+    if no script could be generated.
+    """
+    timer = StageTimer()
+    tracker = ProgressTracker(progress)
+    before = registry.snapshot()
+    reset_peak_rss()
+    cue_futures = {}
+    tts_futures = {}
+    sentences = [0]
+
+    def on_script_event(kind, value):
+        if kind == "cue":
+            if value not in cue_futures:
+                if not cue_futures:
+                    timer.start("media")
+                cue_futures[value] = submit_prefetch([value], count=1, prefer_video=True)[0]
+            tracker.update("script", 0.95, 1, f'Finding visuals for "{value}"...', cue=value)
+        else:
+            prefetch_sentence(value, tts_futures)
+            sentences[0] += 1
+            tracker.update("script", 0.9 * min(1.0, sentences[0] / EXPECTED_SCRIPT_SENTENCES), 1,
+                           f'Writing script... ({sentences[0]} sentences so far)', sentence=value)
+
+    def report():
+        registry.observe("vidai_job_peak_rss_bytes", peak_rss_bytes())
+        metrics = registry.delta(before)
+        return {"stages": timer.report(), "summary": job_summary(metrics), "metrics": metrics}
+
+    print(f"\n🎯 Generating script for topic: {topic}")
+    tracker.update("script", 0, 1, 'Generating creative script...')
+    with timer.stage("script"):
+        script_data = generate_script(topic, force_regenerate=regenerate_script, on_event=on_script_event)
+    narration_script = script_data["narration_script"]
+    image_script = script_data["image_script"]
+    if not narration_script:
+        return None, report()
+    tracker.update("script", 1, 2, 'Script generated successfully!')
+
+    # Media downloads started during streaming keep running alongside TTS;
+    # any cue the stream parser missed is fetched now
+    media_futures = [cue_futures.get(keyword) or submit_prefetch([keyword], count=1, prefer_video=True)[0]
+                     for keyword in extract_keywords(image_script)]
+    timer.track_futures("media", media_futures)
+
+    def on_audio_progress(done, total):
+        tracker.update("audio", done / total, 3, f'Creating natural voice narration... ({done}/{total} sentences)')
+
+    # The narration lives in this job's own scratch directory; parallel jobs never touch it
+    work_dir = new_work_dir()
+    try:
+        print("\n🎤 Generating audio...")
+        tracker.update("audio", 0, 3, 'Creating natural voice narration...')
+        # TTS runs in the persistent engine pool; its workers report their CPU time per sentence
+        tts_cpu = registry.total("vidai_tts_cpu_seconds_total")
+        with timer.stage("audio", worker_cpu=lambda: registry.total("vidai_tts_cpu_seconds_total") - tts_cpu):
+            audio_path, narration_chunks = generate_narration(narration_script, topic, on_progress=on_audio_progress,
+                                                              work_dir=work_dir, in_flight=tts_futures,
+                                                              frame_rate=VIDEO_FPS)
+        tracker.update("audio", 1, 4, 'Audio generated successfully!')
+
+        def on_render_progress(fraction):
+            tracker.update("video", fraction, 5, f'Combining media and creating final video... ({fraction:.0%})')
+
+        print("\n🎬 Creating video...")
+        tracker.update("video", 0, 5, 'Combining media and creating final video...')
+        with timer.stage("video"):
+            video_path = create_video(narration_script, image_script, audio_path, topic,
+                                      media_futures=media_futures, narration_chunks=narration_chunks,
+                                      on_progress=on_render_progress, **render_options)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    timer.print_report()
+    job_report = report()
+    summary = job_report["summary"]
+    # Length of the rendered file, stored with the video in the library
+    summary["video_seconds"] = round(probe(video_path)["duration"], 3)
+    print(f"📊 Downloaded {summary['download_bytes'] / 1e6:.1f} MB, encoded {summary['frames_encoded']} frames"
+          + (f" at {summary['encode_fps']} fps" if summary["encode_fps"] else "")
+          + (f", reused {summary['segments_reused']} cached segments" if summary["segments_reused"] else "")
+          + f", peak memory {summary['peak_rss_mb']} MB")
+    for cache, counts in sorted(summary["cache"].items()):
+        print(f"   cache {cache:<11} {counts['hits']} hits, {counts['misses']} misses")
+    return video_path, job_report
@@ -157,8 +157,13 @@ socket.on('video_complete', (data) => {
         const descMsg = downloadSection.querySelector('p');
         const downloadButton = downloadSection.querySelector('#downloadBtn');
         
-        successMsg.textContent = 'Your Video is Ready! 🎉';
-        descMsg.textContent = 'Your AI-generated video has been created successfully.';
+        if (data.profile === 'preview') {
+            successMsg.textContent = 'Your Preview is Ready! 👀';
+            descMsg.textContent = 'A quick preview is ready. The full-quality video is still rendering and will replace it here.';
+        } else {
+            successMsg.textContent = 'Your Video is Ready! 🎉';
+            descMsg.textContent = 'Your AI-generated video has been created successfully.';
+        }
         downloadButton.innerHTML = '<i class="fas fa-download"></i> Download Video';
         downloadButton.disabled = false;
     }, 2000);
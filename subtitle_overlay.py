@@ -0,0 +1,98 @@
+import os
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+# Caption style, laid out on a 1280x720 canvas and scaled with the render size
+FONT_SIZE = 38
+BOX_WIDTH = 1000
+BOTTOM_MARGIN = 60
+TEXT_COLOR = (255, 255, 255, 255)
+BOX_COLOR = (0, 0, 0, 128)
+FADE_SECONDS = 0.2
+
+# Bold TrueType font for captions; SUBTITLE_FONT may be a file path or a font file name
+SUBTITLE_FONT = os.getenv("SUBTITLE_FONT")
+FONT_CANDIDATES = ("arialbd.ttf", "Arial Bold.ttf", "Arial-Bold.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf")
+
+def caption_style():
+    """Everything besides the text that changes how a caption looks (part of segment cache keys)"""
+    return {"font": SUBTITLE_FONT, "font_size": FONT_SIZE, "box_width": BOX_WIDTH, "bottom_margin": BOTTOM_MARGIN,
+            "text_color": TEXT_COLOR, "box_color": BOX_COLOR, "fade": FADE_SECONDS}
+
+@lru_cache(maxsize=None)
+def load_font(size):
+    for name in ((SUBTITLE_FONT,) if SUBTITLE_FONT else ()) + FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    print("⚠️ No TrueType caption font found, using Pillow's built-in font (set SUBTITLE_FONT)")
+    return ImageFont.load_default()
+
+def wrap_lines(text, font, max_width):
+    """Greedy word wrap of text to max_width pixels"""
+    lines = []
+    for word in text.split():
+        candidate = f"{lines[-1]} {word}" if lines else word
+        if lines and font.getlength(candidate) <= max_width:
+            lines[-1] = candidate
+        else:
+            lines.append(word)
+    return lines
+
+@lru_cache(maxsize=256)
+def render_caption(text, font_size=FONT_SIZE, box_width=BOX_WIDTH):
+    """Caption box as an RGBA uint8 array: centred, wrapped text on a translucent full-width band"""
+    font = load_font(font_size)
+    padding = font_size // 4
+    lines = wrap_lines(text, font, box_width - 2 * padding) or [""]
+    # getbbox works for TrueType and the bitmap fallback font alike (only the former has getmetrics)
+    line_height = font.getbbox("Ag")[3]
+    height = line_height * len(lines) + 2 * padding
+
+    image = Image.new("RGBA", (box_width, height), BOX_COLOR)
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        x = (box_width - font.getlength(line)) / 2
+        draw.text((x, padding + i * line_height), line, font=font, fill=TEXT_COLOR)
+    return np.asarray(image)
+
+@lru_cache(maxsize=64)
+def fade_ramp(n_frames, fps, fade=FADE_SECONDS):
+    """Per-frame opacity for a caption that fades in and out over fade seconds"""
+    t = np.arange(n_frames, dtype=np.float32) / fps
+    duration = n_frames / fps
+    return np.clip(np.minimum(t / fade, (duration - t) / fade), 0, 1)
+
+class CaptionOverlay:
+    """Blits one pre-rendered caption onto frames, bottom-centred, with a precomputed fade.
+
+    Replaces a TextClip (one ImageMagick subprocess per caption) plus
+    per-frame mask compositing with a NumPy blend over the caption's rows only.
+    """
+
+    def __init__(self, text, duration, size, fps):
+        width, height = size
+        scale = height / 720
+        rgba = render_caption(text, int(FONT_SIZE * scale), int(BOX_WIDTH * scale))
+        # Keep the caption on screen even when it wraps past the top
+        rgba = rgba[max(0, rgba.shape[0] - (height - int(BOTTOM_MARGIN * scale))):]
+        self.rgb = rgba[..., :3].astype(np.float32)
+        self.alpha = rgba[..., 3:].astype(np.float32) / 255
+        self.x = (width - rgba.shape[1]) // 2
+        self.y = height - int(BOTTOM_MARGIN * scale) - rgba.shape[0]
+        self.fps = fps
+        self.ramp = fade_ramp(max(1, int(round(duration * fps))), fps)
+
+    def blit(self, frame, t):
+        opacity = self.ramp[min(len(self.ramp) - 1, max(0, int(round(t * self.fps))))]
+        if opacity <= 0:
+            return frame
+        if not frame.flags.writeable:
+            frame = frame.copy()
+        h, w = self.rgb.shape[:2]
+        region = frame[self.y:self.y + h, self.x:self.x + w]
+        blended = region + (self.rgb - region) * (self.alpha * opacity)
+        frame[self.y:self.y + h, self.x:self.x + w] = blended.astype(np.uint8)
+        return frame
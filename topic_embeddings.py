@@ -0,0 +1,245 @@
+import os
+import re
+import sys
+import zlib
+import threading
+import numpy as np
+
+# Hashed feature space for topic vectors; float32 rows, L2-normalised
+EMBEDDING_DIM = int(os.getenv("TOPIC_EMBEDDING_DIM", "512"))
+# Above this many stored topics, candidates come from an LSH index instead of a full scan
+ANN_THRESHOLD = int(os.getenv("TOPIC_ANN_THRESHOLD", "50000"))
+LSH_TABLES = 20
+LSH_BITS = 8
+
+STOPWORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "and", "or", "is", "are", "was", "were",
+    "how", "why", "what", "when", "where", "who", "which", "do", "does", "did", "can", "about",
+    "explained", "explain", "introduction", "intro", "basics", "video", "with", "its", "it",
+}
+
+# Words that frame a question rather than name its subject; each group is one term
+# when comparing subjects, so "X causes" and "why did X start" ask the same thing
+FRAMING_GROUPS = (
+    ("cause", "causes", "caused", "reason", "reasons", "start", "started", "begin", "began", "origin", "origins"),
+    ("work", "works", "working", "function", "functions", "mechanism"),
+    ("meaning", "definition", "define", "defined"),
+)
+FILLER_WORDS = {"overview", "guide", "simple", "simply", "quick", "summary", "beginner", "beginners", "kids",
+                "lesson", "tutorial", "facts", "understanding", "learn", "explanation"}
+
+def _stem(word):
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            return word[:-len(suffix)]
+    return word
+
+def _subject_stem(word):
+    # Coarser than _stem (which feeds stored vectors): "vaccine" and "vaccines" both become "vaccin"
+    word = _stem(word)
+    return word[:-1] if len(word) > 4 and word.endswith("e") else word
+
+_FRAMING = {_subject_stem(word): f"={group[0]}" for group in FRAMING_GROUPS for word in group}
+_FILLER = {_subject_stem(word) for word in FILLER_WORDS}
+
+def content_words(topic):
+    return [_stem(w) for w in re.findall(r"[a-z0-9]+", topic.lower()) if w not in STOPWORDS]
+
+def subject_terms(topic):
+    """Set of stemmed content words, with framing synonyms merged and filler words dropped"""
+    terms = set()
+    for word in re.findall(r"[a-z0-9]+", topic.lower()):
+        if word in STOPWORDS:
+            continue
+        stem = _subject_stem(word)
+        if stem not in _FILLER:
+            terms.add(_FRAMING.get(stem, stem))
+    return terms
+
+def topic_features(topic):
+    """Weighted string features of a topic: content words, word bigrams and character n-grams"""
+    words = content_words(topic)
+    features = {}
+    for word in words:
+        features["w:" + word] = features.get("w:" + word, 0) + 2.0
+        padded = f"<{word}>"
+        for n in (3, 4):
+            for i in range(len(padded) - n + 1):
+                key = "c:" + padded[i:i + n]
+                features[key] = features.get(key, 0) + 0.5
+    for first, second in zip(words, words[1:]):
+        features[f"b:{first} {second}"] = features.get(f"b:{first} {second}", 0) + 1.0
+    return features
+
+def embed_topic(topic):
+    """Signed feature-hashing embedding of a topic (unit length, float32)"""
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for feature, weight in topic_features(topic).items():
+        h = zlib.crc32(feature.encode("utf-8"))
+        vector[h % EMBEDDING_DIM] += weight if (h >> 31) & 1 else -weight
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def topic_match(query, stored, threshold):
+    """Whether a stored video answers query: close embeddings and no subject term of query missing.
+
+    Character n-grams alone score "ottoman empire" vs "roman empire" around
+    0.67, so the cosine only shortlists; the subject terms decide.
+    """
+    score = float(embed_topic(query) @ embed_topic(stored))
+    return score >= threshold and subject_terms(query) <= subject_terms(stored)
+
+# Known near-miss pairs (query, stored topic, should match); run this module to check them
+KNOWN_PAIRS = (
+    ("French Revolution causes", "why did the French revolution start", True),
+    ("causes of world war 1", "why did world war 1 begin", True),
+    ("black holes explained simply", "what is a black hole", True),
+    ("how volcanoes work", "how does a volcano work", True),
+    ("history of the ottoman empire", "history of the roman empire", False),
+    ("meiosis cell division", "cell division mitosis", False),
+    ("type 1 diabetes", "type 2 diabetes", False),
+    ("photosynthesis in desert plants", "photosynthesis in plants", False),
+    ("causes of the french revolution", "effects of the french revolution", False),
+)
+
+def check_known_pairs(threshold):
+    """KNOWN_PAIRS that topic_match gets wrong at threshold"""
+    return [(query, stored, expected) for query, stored, expected in KNOWN_PAIRS
+            if topic_match(query, stored, threshold) != expected]
+
+class TopicEmbeddings:
+    """Append-only on-disk matrix of topic embeddings with batched cosine top-k search.
+
+    Rows live in <base>.f32 (raw float32) and their filenames, one per line,
+    in <base>.ids, next to the video metadata store. A re-registered filename
+    appends a new row; the newest row wins.
+    """
+
+    def __init__(self, base_path="output/topic_embeddings"):
+        self.matrix_path = base_path + ".f32"
+        self.ids_path = base_path + ".ids"
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._filenames = []
+        self._rows = {}
+        self._lsh = None
+
+    def _load(self):
+        if self._matrix is not None:
+            return
+        matrix = np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+        filenames = []
+        if os.path.exists(self.matrix_path) and os.path.exists(self.ids_path):
+            with open(self.ids_path, "r", encoding="utf-8") as f:
+                filenames = f.read().splitlines()
+            raw = np.fromfile(self.matrix_path, dtype=np.float32)
+            rows = min(len(filenames), raw.size // EMBEDDING_DIM)
+            matrix = raw[:rows * EMBEDDING_DIM].reshape(rows, EMBEDDING_DIM)
+            filenames = filenames[:rows]
+        self._matrix = matrix
+        self._filenames = filenames
+        self._rows = {filename: row for row, filename in enumerate(filenames)}
+        self._lsh = None
+
+    def __contains__(self, filename):
+        with self._lock:
+            self._load()
+            return filename in self._rows
+
+    def add(self, filename, topic):
+        self.add_many([(filename, topic)])
+
+    def add_many(self, items):
+        """Embed and persist (filename, topic) pairs"""
+        if not items:
+            return
+        vectors = np.stack([embed_topic(topic) for _, topic in items])
+        with self._lock:
+            self._load()
+            os.makedirs(os.path.dirname(self.matrix_path) or ".", exist_ok=True)
+            with open(self.matrix_path, "ab") as f:
+                vectors.tofile(f)
+            with open(self.ids_path, "a", encoding="utf-8") as f:
+                f.writelines(filename + "\n" for filename, _ in items)
+            start = len(self._filenames)
+            self._matrix = np.vstack([self._matrix, vectors])
+            for offset, (filename, _) in enumerate(items):
+                self._filenames.append(filename)
+                self._rows[filename] = start + offset
+            if self._lsh is not None:
+                self._lsh.add(vectors, start)
+
+    def search(self, topic, top_k=5):
+        """Best (filename, cosine) matches for topic, highest first"""
+        query = embed_topic(topic)
+        if not query.any():
+            return []
+        with self._lock:
+            self._load()
+            if not len(self._filenames):
+                return []
+            if len(self._filenames) > ANN_THRESHOLD:
+                if self._lsh is None:
+                    self._lsh = LSHIndex(EMBEDDING_DIM)
+                    self._lsh.add(self._matrix, 0)
+                rows = self._lsh.candidates(query)
+            else:
+                rows = None
+            matrix, filenames, current = self._matrix, self._filenames, self._rows
+
+        if rows is not None:
+            if not len(rows):
+                return []
+            scores = matrix[rows] @ query
+        else:
+            rows = np.arange(len(filenames))
+            scores = matrix @ query
+
+        k = min(len(scores), top_k * 2)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        results = []
+        for i in best:
+            row = int(rows[i])
+            filename = filenames[row]
+            # Skip stale rows of re-registered filenames
+            if current.get(filename) == row:
+                results.append((filename, float(scores[i])))
+            if len(results) == top_k:
+                break
+        return results
+
+class LSHIndex:
+    """Random-hyperplane LSH over unit vectors: several hash tables of sign bits"""
+
+    def __init__(self, dim, tables=LSH_TABLES, bits=LSH_BITS, seed=0):
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((tables, bits, dim)).astype(np.float32)
+        self.weights = 1 << np.arange(bits)
+        self.buckets = [{} for _ in range(tables)]
+
+    def _keys(self, vectors):
+        # (tables, n) integer bucket keys
+        signs = np.einsum("tbd,nd->tnb", self.planes, vectors) > 0
+        return signs @ self.weights
+
+    def add(self, vectors, start):
+        for table, keys in zip(self.buckets, self._keys(vectors)):
+            for offset, key in enumerate(keys.tolist()):
+                table.setdefault(key, []).append(start + offset)
+
+    def candidates(self, query):
+        keys = self._keys(query[None, :])[:, 0].tolist()
+        rows = set()
+        for table, key in zip(self.buckets, keys):
+            rows.update(table.get(key, ()))
+        return np.fromiter(rows, dtype=np.int64, count=len(rows))
+
+if __name__ == "__main__":
+    from video_search import SEMANTIC_THRESHOLD
+    failures = check_known_pairs(SEMANTIC_THRESHOLD)
+    for query, stored, expected in failures:
+        print(f"❌ {query!r} vs {stored!r}: expected {'a match' if expected else 'no match'}")
+    print(f"{'✅' if not failures else '❌'} {len(KNOWN_PAIRS) - len(failures)}/{len(KNOWN_PAIRS)} known topic pairs "
+          f"behave as expected at threshold {SEMANTIC_THRESHOLD}")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,144 @@
+import os
+import zlib
+import wave
+import asyncio
+import logging
+import numpy as np
+
+logger = logging.getLogger("AudioGenerator")
+
+# Narration voice override; each backend picks its own default when unset
+TTS_VOICE = os.getenv("TTS_VOICE")
+
+# Words per minute the pyttsx3 rate is expressed in; other backends scale relative to it
+BASE_RATE = 150
+
+class TTSBackend:
+    """One text-to-speech engine, created once per worker process and reused.
+
+    resolve_voice() runs once (at pool startup) and its result is passed to
+    every engine, so no worker repeats the voice search. synthesize() writes
+    text to path in the backend's native format (extension).
+    """
+    name = None
+    extension = ".wav"
+
+    def __init__(self, voice, rate=BASE_RATE):
+        self.voice = voice
+        self.rate = rate
+
+    @classmethod
+    def resolve_voice(cls):
+        return TTS_VOICE or ""
+
+    def synthesize(self, text, path):
+        raise NotImplementedError
+
+class Pyttsx3Backend(TTSBackend):
+    """Local SAPI5/NSSpeech/espeak voices via pyttsx3 (offline, the default)"""
+    name = "pyttsx3"
+
+    def __init__(self, voice, rate=BASE_RATE):
+        import pyttsx3
+        super().__init__(voice, rate)
+        self.engine = pyttsx3.init()
+        if voice:
+            self.engine.setProperty("voice", voice)
+        self.engine.setProperty("rate", rate)      # Speed of speech
+        self.engine.setProperty("volume", 1.0)     # Volume (0.0 to 1.0)
+
+    @classmethod
+    def resolve_voice(cls):
+        """Prefer a female voice, then any English one; "" means the engine default"""
+        if TTS_VOICE:
+            return TTS_VOICE
+        import pyttsx3
+        voices = pyttsx3.init().getProperty("voices")
+
+        # Try to select a female voice if available
+        for v in voices:
+            if "female" in v.name.lower() or "female" in v.id.lower() or "zira" in v.name.lower():
+                logger.info(f"Selected female voice: {v.name}")
+                return v.id
+
+        # If no female voice found, try to select a voice with ID containing 'en'
+        for v in voices:
+            if 'en' in v.id.lower():
+                logger.info(f"Selected English voice: {v.name}")
+                return v.id
+
+        logger.warning("No suitable voice found, using default")
+        return ""
+
+    def synthesize(self, text, path):
+        self.engine.save_to_file(text, path)
+        self.engine.runAndWait()
+
+class EdgeTTSBackend(TTSBackend):
+    """Microsoft Edge neural voices via edge-tts (needs network access)"""
+    name = "edge"
+    extension = ".mp3"
+
+    def __init__(self, voice, rate=BASE_RATE):
+        import edge_tts
+        super().__init__(voice, rate)
+        self._edge_tts = edge_tts
+        self._rate = f"{round((rate / BASE_RATE - 1) * 100):+d}%"
+
+    @classmethod
+    def resolve_voice(cls):
+        return TTS_VOICE or "en-US-AriaNeural"
+
+    def synthesize(self, text, path):
+        communicate = self._edge_tts.Communicate(text, self.voice, rate=self._rate)
+        asyncio.run(communicate.save(path))
+
+class GTTSBackend(TTSBackend):
+    """Google Translate TTS via gTTS (needs network access; voice is a language code, rate is fixed)"""
+    name = "gtts"
+    extension = ".mp3"
+
+    def __init__(self, voice, rate=BASE_RATE):
+        from gtts import gTTS
+        super().__init__(voice, rate)
+        self._gtts = gTTS
+
+    @classmethod
+    def resolve_voice(cls):
+        return TTS_VOICE or "en"
+
+    def synthesize(self, text, path):
+        self._gtts(text, lang=self.voice).save(path)
+
+class ToneBackend(TTSBackend):
+    """Synthetic speech-shaped tones, one burst per word (offline and deterministic; for benchmarks)
+
+    Word bursts are paced at the speaking rate with short gaps, and clauses
+    and sentences end in longer silences, so timing and pause detection see
+    audio shaped like real narration.
+    """
+    name = "tone"
+    sample_rate = 24000
+
+    def synthesize(self, text, path):
+        word_seconds = 60.0 / self.rate
+        burst = int(self.sample_rate * word_seconds * 0.8)
+        t = np.arange(burst) / self.sample_rate
+        # 10 ms attack and release so bursts don't click
+        envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.01)
+
+        pieces = [np.zeros(int(self.sample_rate * 0.05))]
+        for word in text.split():
+            pitch = 140 + zlib.crc32(word.lower().encode("utf-8")) % 120
+            pieces.append(0.3 * np.sin(2 * np.pi * pitch * t) * envelope)
+            pause = 0.3 if word[-1] in ".!?" else 0.15 if word[-1] in ",;:" else word_seconds * 0.2
+            pieces.append(np.zeros(int(self.sample_rate * pause)))
+
+        samples = (np.concatenate(pieces) * 32767).astype("<i2")
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(self.sample_rate)
+            f.writeframes(samples.tobytes())
+
+TTS_BACKENDS = {backend.name: backend for backend in (Pyttsx3Backend, EdgeTTSBackend, GTTSBackend, ToneBackend)}
@@ -1,7 +1,15 @@
 import os
-import json
 from difflib import SequenceMatcher
 import re
+import threading
+from topic_embeddings import TopicEmbeddings, subject_terms
+from video_store import VideoStore
+
+# Cosine similarity above which a differently worded topic is a candidate for the same
+# video; it must also name every subject of the request (topic_embeddings.topic_match)
+SEMANTIC_THRESHOLD = float(os.getenv("SEMANTIC_THRESHOLD", "0.65"))
+
+_store = VideoStore()
 
 def normalize_topic(topic):
     """Normalize topic for comparison by removing special chars and converting to lowercase"""
@@ -35,49 +43,174 @@ def calculate_similarity(topic1, topic2):
     return similarity
 
 def load_video_metadata():
-    """Load existing video metadata from JSON file"""
-    metadata_file = "output/video_metadata.json"
-    if os.path.exists(metadata_file):
-        try:
-            with open(metadata_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"Error loading metadata: {e}")
+    """Load all video metadata (compatibility shim over VideoStore)"""
+    try:
+        return _store.all()
+    except Exception as e:
+        print(f"Error loading metadata: {e}")
     return {}
 
 def save_video_metadata(metadata):
-    """Save video metadata to JSON file"""
-    os.makedirs("output", exist_ok=True)
-    metadata_file = "output/video_metadata.json"
+    """Replace all video metadata (compatibility shim over VideoStore)"""
     try:
-        with open(metadata_file, 'w', encoding='utf-8') as f:
-            json.dump(metadata, f, indent=2, ensure_ascii=False)
+        _store.replace_all(metadata)
     except Exception as e:
         print(f"Error saving metadata: {e}")
 
-def search_existing_video(topic, similarity_threshold=0.75):
+def topic_ngrams(norm_topic, n=3):
+    """Character n-grams of a normalized topic, padded so short topics still get some"""
+    padded = f" {norm_topic} "
+    return {padded[i:i + n] for i in range(max(1, len(padded) - n + 1))}
+
+class TopicIndex:
+    """In-memory inverted index over stored video topics.
+
+    Candidates are gathered from token and character-trigram postings, and
+    only the best top_k of them are scored with calculate_similarity, so a
+    lookup no longer compares against every video in the library.
+    """
+
+    def __init__(self, output_dir="output"):
+        self.output_dir = output_dir
+        self._topics = {}
+        self._grams = {}
+        self._tokens = {}
+        self._dir_mtime = None
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def _add(self, filename, topic):
+        self._remove(filename)
+        self.version += 1
+        norm = normalize_topic(topic)
+        grams = topic_ngrams(norm)
+        tokens = set(norm.split())
+        self._topics[filename] = (topic, len(grams))
+        for gram in grams:
+            self._grams.setdefault(gram, set()).add(filename)
+        for token in tokens:
+            self._tokens.setdefault(token, set()).add(filename)
+
+    def _remove(self, filename):
+        if filename not in self._topics:
+            return
+        topic, _ = self._topics.pop(filename)
+        norm = normalize_topic(topic)
+        for gram in topic_ngrams(norm):
+            self._grams.get(gram, set()).discard(filename)
+        for token in norm.split():
+            self._tokens.get(token, set()).discard(filename)
+
+    def add(self, filename, topic):
+        with self._lock:
+            self._add(filename, topic)
+
+    def topic(self, filename):
+        with self._lock:
+            entry = self._topics.get(filename)
+            return entry[0] if entry else None
+
+    def topics(self):
+        """Snapshot of filename -> stored topic"""
+        with self._lock:
+            return {filename: topic for filename, (topic, _) in self._topics.items()}
+
+    def sync(self):
+        """Pick up videos added or removed outside register_new_video; a no-op unless output/ changed"""
+        try:
+            mtime = os.stat(self.output_dir).st_mtime
+        except OSError:
+            return
+        with self._lock:
+            if mtime == self._dir_mtime:
+                return
+            video_files = {f for f in os.listdir(self.output_dir) if f.endswith('.mp4')}
+            for filename in set(self._topics) - video_files:
+                self._remove(filename)
+            new_files = video_files - set(self._topics)
+            stored_topics = _store.topics_for(new_files)
+            for filename in new_files:
+                if filename in stored_topics:
+                    stored_topic = stored_topics[filename]
+                else:
+                    # Extract topic from filename (remove _video.mp4 suffix)
+                    stored_topic = filename.replace('_video.mp4', '').replace('_', ' ')
+                self._add(filename, stored_topic)
+            self._dir_mtime = mtime
+
+    def candidates(self, topic, top_k=50):
+        """Stored (filename, topic) pairs sharing the most n-grams/tokens with topic"""
+        norm = normalize_topic(topic)
+        grams = topic_ngrams(norm)
+        with self._lock:
+            shared = {}
+            for gram in grams:
+                for filename in self._grams.get(gram, ()):
+                    shared[filename] = shared.get(filename, 0) + 1
+            for token in set(norm.split()):
+                for filename in self._tokens.get(token, ()):
+                    shared.setdefault(filename, 0)
+
+            def overlap(filename):
+                # Containment in either direction ranks substring matches first;
+                # Dice breaks ties in favour of the closest overall (exact) match
+                _, n_grams = self._topics[filename]
+                common = shared[filename]
+                return (max(common / len(grams), common / n_grams), 2 * common / (len(grams) + n_grams))
+
+            best = sorted(shared, key=overlap, reverse=True)[:top_k]
+            return [(filename, self._topics[filename][0]) for filename in best]
+
+_index = TopicIndex()
+_embeddings = TopicEmbeddings()
+_embedded_version = [-1]
+
+def _sync_embeddings():
+    """Embed any indexed video that has no vector yet (e.g. videos from before embeddings existed)"""
+    if _embedded_version[0] == _index.version:
+        return
+    version = _index.version
+    missing = [(filename, topic) for filename, topic in _index.topics().items() if filename not in _embeddings]
+    _embeddings.add_many(missing)
+    _embedded_version[0] = version
+
+def search_similar_meaning(topic, threshold=SEMANTIC_THRESHOLD, top_k=5):
+    """Closest stored video by topic embedding, for rewordings the lexical check misses.
+
+    Candidates above threshold are accepted only if their topic covers every
+    subject term of the request, so "ottoman empire" never returns "roman empire".
+    """
+    _sync_embeddings()
+    terms = subject_terms(topic)
+    for video_file, score in _embeddings.search(topic, top_k):
+        if score < threshold:
+            break
+        video_path = os.path.join("output", video_file)
+        stored_topic = _index.topic(video_file)
+        if stored_topic is not None and terms <= subject_terms(stored_topic) and os.path.exists(video_path):
+            return {
+                'filename': video_file,
+                'path': video_path,
+                'topic': stored_topic,
+                'similarity': score
+            }
+    return None
+
+def search_existing_video(topic, similarity_threshold=0.75, top_k=50):
     """Search for existing videos with similar topics"""
     if not os.path.exists("output"):
         return None
     
-    # Load metadata
-    metadata = load_video_metadata()
-    
-    # Check existing video files
-    video_files = [f for f in os.listdir("output") if f.endswith('.mp4')]
+    _index.sync()
     
     best_match = None
     best_similarity = 0
     
-    for video_file in video_files:
+    # Only the closest candidates from the index get the full similarity check
+    for video_file, stored_topic in _index.candidates(topic, top_k):
         video_path = os.path.join("output", video_file)
-        
-        # Get topic from metadata or filename
-        if video_file in metadata:
-            stored_topic = metadata[video_file].get('topic', '')
-        else:
-            # Extract topic from filename (remove _video.mp4 suffix)
-            stored_topic = video_file.replace('_video.mp4', '').replace('_', ' ')
+        if not os.path.exists(video_path):
+            continue
         
         # Calculate similarity
         similarity = calculate_similarity(topic, stored_topic)
@@ -91,16 +224,18 @@ def search_existing_video(topic, similarity_threshold=0.75):
                 'similarity': similarity
             }
     
+    if best_match is None:
+        best_match = search_similar_meaning(topic)
+    
     return best_match
 
-def register_new_video(topic, filename):
+def register_new_video(topic, filename, duration=None, render_stats=None):
     """Register a newly created video in metadata"""
-    metadata = load_video_metadata()
-    
-    metadata[filename] = {
-        'topic': topic,
-        'created_at': str(os.path.getctime(os.path.join("output", filename))),
-        'normalized_topic': normalize_topic(topic)
-    }
-    
-    save_video_metadata(metadata)
+    video_path = os.path.join("output", filename)
+    _store.upsert(filename, topic, normalize_topic(topic),
+                  created_at=os.path.getctime(video_path),
+                  duration=duration,
+                  file_size=os.path.getsize(video_path),
+                  render_stats=render_stats)
+    _index.add(filename, topic)
+    _embeddings.add(filename, topic)
@@ -0,0 +1,150 @@
+import os
+import json
+import sqlite3
+import threading
+
+VIDEO_DB_PATH = os.getenv("VIDEO_DB_PATH", "output/videos.db")
+LEGACY_METADATA_FILE = "output/video_metadata.json"
+
+class VideoStore:
+    """Video metadata in SQLite (WAL mode), safe for concurrent writers.
+
+    Each registration is a single-row upsert in its own transaction, so
+    parallel render workers no longer race on a shared JSON file. On first
+    open the legacy output/video_metadata.json is imported and renamed to
+    video_metadata.json.migrated.
+    """
+
+    def __init__(self, db_path=VIDEO_DB_PATH, legacy_path=LEGACY_METADATA_FILE):
+        self.db_path = db_path
+        self.legacy_path = legacy_path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        with self._init_lock:
+            if not self._initialized:
+                self._init_db(conn)
+                self._initialized = True
+        return conn
+
+    def _init_db(self, conn):
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    filename TEXT PRIMARY KEY,
+                    topic TEXT NOT NULL,
+                    normalized_topic TEXT NOT NULL,
+                    created_at REAL,
+                    duration REAL,
+                    file_size INTEGER,
+                    render_stats TEXT
+                )""")
+            for column in ("normalized_topic", "created_at", "duration", "file_size"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS videos_{column} ON videos ({column})")
+        self._migrate_json(conn)
+
+    def _migrate_json(self, conn):
+        """One-time import of the legacy JSON metadata file"""
+        if not os.path.exists(self.legacy_path):
+            return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+        except Exception as e:
+            print(f"Error loading metadata for migration: {e}")
+            return
+
+        with conn:
+            for filename, entry in metadata.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO videos (filename, topic, normalized_topic, created_at) VALUES (?, ?, ?, ?)",
+                    (filename, entry.get('topic', ''), entry.get('normalized_topic', ''),
+                     _to_float(entry.get('created_at'))))
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+        print(f"📦 Migrated {len(metadata)} videos from {self.legacy_path} to {self.db_path}")
+
+    def upsert(self, filename, topic, normalized_topic, created_at=None, duration=None,
+               file_size=None, render_stats=None):
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                INSERT INTO videos (filename, topic, normalized_topic, created_at, duration, file_size, render_stats)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(filename) DO UPDATE SET
+                    topic = excluded.topic,
+                    normalized_topic = excluded.normalized_topic,
+                    created_at = excluded.created_at,
+                    duration = COALESCE(excluded.duration, videos.duration),
+                    file_size = COALESCE(excluded.file_size, videos.file_size),
+                    render_stats = COALESCE(excluded.render_stats, videos.render_stats)
+                """, (filename, topic, normalized_topic, created_at, duration, file_size,
+                      json.dumps(render_stats) if render_stats is not None else None))
+
+    def get(self, filename):
+        row = self._connect().execute("SELECT * FROM videos WHERE filename = ?", (filename,)).fetchone()
+        return _entry(row) if row else None
+
+    def topics_for(self, filenames):
+        """filename -> topic for the given filenames that are in the store"""
+        conn = self._connect()
+        filenames = list(filenames)
+        topics = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(filenames), 500):
+            batch = filenames[i:i + 500]
+            placeholders = ",".join("?" * len(batch))
+            for row in conn.execute(f"SELECT filename, topic FROM videos WHERE filename IN ({placeholders})", batch):
+                topics[row["filename"]] = row["topic"]
+        return topics
+
+    def all(self):
+        """Every video as filename -> entry, in the shape video_metadata.json used to have"""
+        rows = self._connect().execute("SELECT * FROM videos").fetchall()
+        return {row["filename"]: _entry(row) for row in rows}
+
+    def replace_all(self, metadata):
+        """Make the store hold exactly the given filename -> entry mapping"""
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep (filename TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM keep")
+            for filename, entry in metadata.items():
+                conn.execute("INSERT OR IGNORE INTO keep (filename) VALUES (?)", (filename,))
+                conn.execute("""
+                    INSERT OR REPLACE INTO videos
+                        (filename, topic, normalized_topic, created_at, duration, file_size, render_stats)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, (filename, entry.get('topic', ''), entry.get('normalized_topic', ''),
+                          _to_float(entry.get('created_at')), entry.get('duration'), entry.get('file_size'),
+                          json.dumps(entry['render_stats']) if entry.get('render_stats') is not None else None))
+            conn.execute("DELETE FROM videos WHERE filename NOT IN (SELECT filename FROM keep)")
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def _entry(row):
+    entry = {
+        'topic': row["topic"],
+        'created_at': str(row["created_at"]) if row["created_at"] is not None else None,
+        'normalized_topic': row["normalized_topic"],
+    }
+    if row["duration"] is not None:
+        entry['duration'] = row["duration"]
+    if row["file_size"] is not None:
+        entry['file_size'] = row["file_size"]
+    if row["render_stats"] is not None:
+        entry['render_stats'] = json.loads(row["render_stats"])
+    return entry
@@ -1,18 +1,29 @@
 from flask import Flask, render_template, request, jsonify, send_file
+from werkzeug.security import safe_join
+from werkzeug.wsgi import FileWrapper
 from flask_socketio import SocketIO, emit
-import threading
 import os
-import time
 import random
-from generate_script import generate_script
-from generate_audio import generate_audio
-from create_video import create_video
+from create_video import RENDER_PROFILES
+from job_queue import JobQueue, QueueFull, ACTIVE_STATES
+from metrics import registry
 from video_search import search_existing_video, register_new_video
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'vidai_secret_key'
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Send a fast preview render before the final one unless the client says otherwise
+PREVIEW_FIRST = os.getenv("PREVIEW_FIRST", "false").lower() == "true"
+# Browser cache lifetime for downloads; clients revalidate with ETag/If-Modified-Since afterwards
+DOWNLOAD_MAX_AGE = int(os.getenv("DOWNLOAD_MAX_AGE", "3600"))
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+# Only rendered videos and their subtitle sidecars are downloadable; output/ also holds the job and video databases
+DOWNLOAD_EXTENSIONS = ('.mp4', '.srt', '.vtt')
+DOWNLOAD_FOLDERS = ('', 'previews')
+# Behind nginx/Apache, let the proxy send the file itself (X-Sendfile)
+app.config['USE_X_SENDFILE'] = os.getenv("DOWNLOAD_X_SENDFILE", "false").lower() == "true"
+
 # Random facts for entertainment during processing
 RANDOM_FACTS = [
     "The human brain processes visual information 60,000 times faster than text!",
@@ -31,123 +42,141 @@ RANDOM_FACTS = [
 def index():
     return render_template('index.html')
 
+def relay_job_event(job_id, event, payload, subscribers):
+    """Forward job queue events to every socket session waiting on the job"""
+    if event == 'done':
+        # Jobs run in worker processes; fold their metrics into this process's /metrics
+        registry.merge(payload['report']['metrics'])
+        registry.inc("vidai_jobs_total", status="done")
+        if os.path.dirname(payload['path']) == 'output':
+            # Make the new video findable by later similar requests
+            summary = payload['report']['summary']
+            render_stats = {'stages': payload['report']['stages'], 'summary': summary}
+            register_new_video(payload['topic'], os.path.basename(payload['path']),
+                               duration=summary.get('video_seconds'), render_stats=render_stats)
+    elif event == 'failed':
+        registry.inc("vidai_jobs_total", status="failed")
+
+    for session_id in subscribers:
+        if event == 'queued':
+            position = payload['queue_position']
+            socketio.emit('progress', {'step': 1, 'message': f'Waiting in queue (position {position})...', 'percentage': 10,
+                                       'job_id': job_id, 'status': 'queued', 'queue_position': position}, room=session_id)
+        elif event == 'started':
+            socketio.emit('progress', {'step': 1, 'message': 'No existing video found. Generating new content...', 'percentage': 10,
+                                       'job_id': job_id, 'status': 'running'}, room=session_id)
+        elif event == 'progress':
+            socketio.emit('progress', dict(payload, job_id=job_id, status='running'), room=session_id)
+        elif event == 'preview':
+            # Deliver the quick preview while the final render continues
+            socketio.emit('video_complete', {
+                'filename': os.path.relpath(payload['path'], 'output'),
+                'path': payload['path'],
+                'profile': 'preview',
+                'status': 'success'
+            }, room=session_id)
+        elif event == 'done':
+            video_path = payload['path']
+            video_filename = os.path.relpath(video_path, 'output')
+            socketio.emit('progress', {'step': 6, 'message': 'Video assembly complete!', 'percentage': 100,
+                                       'job_id': job_id, 'status': 'done',
+                                       'stages': payload['report']['stages'], 'summary': payload['report']['summary']}, room=session_id)
+            if os.path.exists(video_path):
+                socketio.emit('video_complete', {
+                    'filename': video_filename,
+                    'path': video_path,
+                    'status': 'success'
+                }, room=session_id)
+                print(f"Sent video_complete event for: {video_filename}")
+            else:
+                socketio.emit('error', {'message': f'Video file not found after generation: {video_filename}'}, room=session_id)
+        elif event == 'failed':
+            print(f"Error in video generation: {payload['message']}")
+            socketio.emit('error', {'message': f"Failed to create video: {payload['message']}"}, room=session_id)
+
+job_queue = JobQueue(relay_job_event)
+
+@socketio.on('connect')
+def handle_connect():
+    # Start the workers (and resume jobs from a previous run) in the serving process
+    job_queue.start()
+
 @socketio.on('generate_video')
 def handle_video_generation(data):
     topic = data['topic']
     session_id = request.sid
+    profile = data.get('profile', 'final')
+    if profile not in RENDER_PROFILES:
+        profile = 'final'
+    preview_first = bool(data.get('preview_first', PREVIEW_FIRST))
     
-    def generate_video_process():
-        try:
-            # Step 0: Search for existing video
-            socketio.emit('progress', {'step': 0, 'message': 'Searching for existing videos...', 'percentage': 5}, room=session_id)
-            time.sleep(0.5)
-            
-            existing_video = search_existing_video(topic)
-            
-            if existing_video:
-                # Found existing video
-                socketio.emit('progress', {'step': 6, 'message': f'Found existing video! (Similarity: {existing_video["similarity"]:.1%})', 'percentage': 100}, room=session_id)
-                time.sleep(1)
-                socketio.emit('video_found', {
-                    'filename': existing_video['filename'],
-                    'path': existing_video['path'],
-                    'original_topic': existing_video['topic'],
-                    'similarity': existing_video['similarity']
-                }, room=session_id)
-                return
-            
-            # No existing video found, proceed with generation
-            socketio.emit('progress', {'step': 1, 'message': 'No existing video found. Generating new content...', 'percentage': 10}, room=session_id)
-            
-            # Step 1: Generate Script
-            socketio.emit('progress', {'step': 1, 'message': 'Generating creative script...', 'percentage': 15}, room=session_id)
-            time.sleep(1)
-            script_data = generate_script(topic)
-            
-            if not script_data['narration_script']:
-                socketio.emit('error', {'message': 'Failed to generate script. Please try again.'}, room=session_id)
-                return
-            
-            socketio.emit('progress', {'step': 2, 'message': 'Script generated successfully!', 'percentage': 35}, room=session_id)
-            
-            # Step 2: Generate Audio
-            socketio.emit('progress', {'step': 3, 'message': 'Creating natural voice narration...', 'percentage': 55}, room=session_id)
-            time.sleep(1)
-            audio_path = generate_audio(script_data['narration_script'], topic)
-            
-            socketio.emit('progress', {'step': 4, 'message': 'Audio generated successfully!', 'percentage': 75}, room=session_id)
-            
-            # Step 3: Create Video
-            socketio.emit('progress', {'step': 5, 'message': 'Combining media and creating final video...', 'percentage': 80}, room=session_id)
-            time.sleep(1)
-            
-            try:
-                create_video(script_data['narration_script'], script_data['image_script'], audio_path, topic)
-                
-                # Video completed - show 100% first
-                socketio.emit('progress', {'step': 6, 'message': 'Video assembly complete!', 'percentage': 100}, room=session_id)
-                
-                # Generate path and filename
-                video_filename = f"{topic.replace(' ', '_')}_video.mp4"
-                video_path = f"output/{video_filename}"
-                
-                # Wait to ensure the file exists
-                time.sleep(1)
-                if os.path.exists(os.path.join("output", video_filename)):
-                    # Then send completion event with explicit data
-                    socketio.emit('video_complete', {
-                        'filename': video_filename,
-                        'path': video_path,
-                        'status': 'success'
-                    }, room=session_id)
-                    print(f"Sent video_complete event for: {video_filename}")
-                else:
-                    socketio.emit('error', {'message': f'Video file not found after generation: {video_filename}'}, room=session_id)
-                    
-            except Exception as video_error:
-                print(f"Error in video creation: {video_error}")
-                socketio.emit('error', {'message': f'Failed to create video: {str(video_error)}'}, room=session_id)
+    try:
+        # Step 0: Search for existing video
+        emit('progress', {'step': 0, 'message': 'Searching for existing videos...', 'percentage': 5})
+        
+        existing_video = search_existing_video(topic)
+        
+        if existing_video:
+            # Found existing video
+            emit('progress', {'step': 6, 'message': f'Found existing video! (Similarity: {existing_video["similarity"]:.1%})', 'percentage': 100})
+            emit('video_found', {
+                'filename': existing_video['filename'],
+                'path': existing_video['path'],
+                'original_topic': existing_video['topic'],
+                'similarity': existing_video['similarity']
+            })
+            return
         
-        except Exception as e:
-            print(f"Error in video generation: {e}")
-            socketio.emit('error', {'message': f'An error occurred: {str(e)}'}, room=session_id)
+        # No existing video found, queue a generation job (or join an identical one)
+        options = {'profile': profile, 'preview_first': preview_first,
+                   'regenerate_script': bool(data.get('regenerate', False))}
+        job_id, deduped = job_queue.submit(topic, options, session_id)
+        if deduped:
+            emit('progress', {'step': 1, 'message': 'Someone is already generating this video, joining in...', 'percentage': 10,
+                              'job_id': job_id, 'status': job_queue.get(job_id)['status']})
     
-    # Start video generation in a separate thread
-    thread = threading.Thread(target=generate_video_process)
-    thread.daemon = True
-    thread.start()
+    except QueueFull as e:
+        emit('error', {'message': str(e)})
+    except Exception as e:
+        print(f"Error in video generation: {e}")
+        emit('error', {'message': f'An error occurred: {str(e)}'})
 
 @socketio.on('get_random_fact')
 def handle_random_fact():
     fact = random.choice(RANDOM_FACTS)
     emit('random_fact', {'fact': fact})
 
-@app.route('/download/<filename>')
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint: counters from finished jobs plus current queue depth"""
+    counts = job_queue.status_counts()
+    gauges = [("vidai_jobs", {"status": status}, counts.get(status, 0)) for status in ACTIVE_STATES]
+    return app.response_class(registry.prometheus(gauges), mimetype='text/plain; version=0.0.4')
+
+@app.route('/download/<path:filename>')
 def download_video(filename):
+    """Serve a rendered video (or its .srt/.vtt sidecar).
+
+    Supports byte ranges (206) so players can seek, and ETag/Last-Modified
+    conditional requests (304). Add ?inline=1 to play in the browser rather
+    than download.
+    """
     try:
-        file_path = os.path.join('output', filename)
-        if os.path.exists(file_path):
-            # Get file size for Content-Length header
-            file_size = os.path.getsize(file_path)
-            
-            def generate():
-                with open(file_path, 'rb') as f:
-                    while True:
-                        data = f.read(4096)  # Read in chunks
-                        if not data:
-                            break
-                        yield data
-            
-            response = app.response_class(
-                generate(),
-                mimetype='video/mp4',
-                headers={
-                    'Content-Disposition': f'attachment; filename="{filename}"',
-                    'Content-Length': str(file_size),
-                    'Content-Type': 'video/mp4'
-                }
+        # filename may include a profile folder, e.g. previews/<topic>_video.mp4
+        folder, name = os.path.split(filename)
+        allowed = folder in DOWNLOAD_FOLDERS and os.path.splitext(name)[1].lower() in DOWNLOAD_EXTENSIONS
+        file_path = safe_join('output', filename) if allowed else None
+        if file_path and os.path.isfile(file_path):
+            # Servers such as gunicorn provide a sendfile()-based wrapper; otherwise read 1 MiB at a time
+            request.environ.setdefault('wsgi.file_wrapper', lambda f, buffer_size=8192: FileWrapper(f, DOWNLOAD_BUFFER_SIZE))
+            return send_file(
+                os.path.abspath(file_path),
+                as_attachment=not request.args.get('inline'),
+                download_name=os.path.basename(filename),
+                conditional=True,
+                etag=True,
+                max_age=DOWNLOAD_MAX_AGE,
             )
-            return response
         else:
             return jsonify({'error': 'File not found'}), 404
     except Exception as e: